@@ -0,0 +1,97 @@
+''' End-to-end pages/sec, time per stage and peak memory of the crawler for several THREADCOUNT values, engines and
+frontier backends, with no network: the cache server is a local stub (benchmarks/stub_server.py) that replays an
+archive recorded by a real crawl, or serves a synthetic site if there is none.
+
+Record an archive by setting RECORD = crawl.archive in config.ini for a real crawl, then
+Usage: python -m benchmarks.bench_crawl [--archive crawl.archive] [--seeds URL,URL] [--threads 1,2,4,8]
+    [--engines threads,async] [--frontiers shelve,sqlite] [--latency S] [--hosts H] [--pages P]
+Every configuration crawls in a fresh process, so the peak memory reported is its own. robots.txt is fetched directly
+rather than through the cache server, so it can't be replayed and every url is allowed.
+'''
+import logging
+import multiprocessing
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from configparser import ConfigParser
+
+try:
+    import resource
+except ImportError:
+    # not on Windows, peak memory is not reported there
+    resource = None
+
+from utils.archive import ResponseArchive
+from utils.metrics import metrics
+from crawler.frontier import Frontier
+from crawler.sqlite_frontier import SQLiteFrontier
+from crawler.worker import Worker
+from crawler.async_worker import AsyncWorker
+from benchmarks.bench_engines import CONFIG_FILE, make_config, crawl
+from benchmarks.stub_server import StubCacheServer
+
+FRONTIERS = {"shelve": Frontier, "sqlite": SQLiteFrontier}
+WORKERS = {"threads": Worker, "async": AsyncWorker}
+# the stages shown for every run, see crawler/metrics.py for all of them
+STAGES = ("download", "parse", "scrape", "frontier_add_url", "frontier_mark_complete")
+
+
+def run(config, engine, frontier):
+    ''' Crawls once in this process. Returns seconds, pages, latency of every stage and peak memory in MB. '''
+    logging.disable(logging.INFO)
+    elapsed = crawl(config, worker_factory=WORKERS[engine], frontier_factory=FRONTIERS[frontier])
+    snapshot = metrics.snapshot()
+    # ru_maxrss is in KB on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    return elapsed, snapshot["counters"].get("pages", 0), snapshot["latency"], peak
+
+
+def report(label, elapsed, pages, latency, peak):
+    busy = sum(latency[stage]["total"] for stage in STAGES if stage in latency) or 1.0
+    stages = ", ".join(
+        f"{stage} {latency[stage]['mean'] * 1000:.2f} ms ({latency[stage]['total'] / busy:.0%})"
+        for stage in STAGES if stage in latency)
+    memory = f", {peak:.0f} MB peak" if peak is not None else ""
+    print(f"{label}: {pages} pages in {elapsed:.2f}s, {pages / elapsed:.1f} pages/s{memory}\n    {stages}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--archive", type=str, default=None)
+    parser.add_argument("--seeds", type=str, default=None)
+    parser.add_argument("--threads", type=str, default="1,2,4,8")
+    parser.add_argument("--engines", type=str, default="threads")
+    parser.add_argument("--frontiers", type=str, default="shelve,sqlite")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--hosts", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+
+    archive = ResponseArchive(args.archive, "r") if args.archive else None
+    server = StubCacheServer(args.hosts, args.pages, args.latency, archive=archive).start()
+    seeds = args.seeds
+    if seeds is None:
+        # a recorded crawl started from the seeds of config.ini
+        cparser = ConfigParser()
+        cparser.read(CONFIG_FILE)
+        seeds = cparser["CRAWLER"]["SEEDURL"] if archive else ",".join(server.seed_urls())
+    source = f"{len(archive)} recorded answers" if archive else f"synthetic site of {args.hosts * args.pages} pages"
+    print(f"{source}, {args.latency * 1000:.0f} ms per answer")
+
+    context = multiprocessing.get_context("spawn")
+    try:
+        for engine in args.engines.split(","):
+            for frontier in args.frontiers.split(","):
+                for threads in [int(count) for count in args.threads.split(",")]:
+                    config = make_config(server, threads, engine, args.concurrency, {
+                        ("CRAWLER", "SEEDURL"): seeds,
+                        ("LOCAL PROPERTIES", "FRONTIER"): frontier,
+                        ("LOCAL PROPERTIES", "METRICSINTERVAL"): "0",
+                        ("LOCAL PROPERTIES", "RECORD"): ""})
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as process:
+                        result = process.submit(run, config, engine, frontier).result()
+                    report(f"{engine} {frontier} THREADCOUNT={threads}", *result)
+    finally:
+        server.stop()
+        if archive is not None:
+            archive.close()
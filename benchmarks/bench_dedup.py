@@ -0,0 +1,50 @@
+''' Lookup latency of the near-duplicate index as it grows.
+
+Usage: python -m benchmarks.bench_dedup [--size N] [--distance K] [--blocks B]
+'''
+import random
+import time
+from argparse import ArgumentParser
+
+from utils.simhash import SimhashIndex
+
+
+def flip_bits(fingerprint, count):
+    for bit in random.sample(range(64), count):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def lookup_latency(index, queries):
+    start = time.perf_counter()
+    for query in queries:
+        index.find(query)
+    return (time.perf_counter() - start) / len(queries)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--size", type=int, default=2000000)
+    parser.add_argument("--distance", type=int, default=3)
+    parser.add_argument("--blocks", type=int, default=None)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    index = SimhashIndex(args.distance, args.blocks)
+    stored = []
+    checkpoint = 1000
+    print(f"{len(index.tables)} tables, max distance {args.distance}")
+    print(f"{'size':>10} {'miss (us)':>10} {'hit (us)':>10}")
+    while len(index) < args.size:
+        fingerprint = random.getrandbits(64)
+        index.add(fingerprint)
+        if len(stored) < args.queries:
+            stored.append(fingerprint)
+        if len(index) == checkpoint or len(index) == args.size:
+            misses = [random.getrandbits(64) for _ in range(args.queries)]
+            hits = [flip_bits(random.choice(stored), random.randint(0, args.distance)) for _ in range(args.queries)]
+            assert all(index.find(hit) is not None for hit in hits[:1000])
+            print(f"{len(index):>10} {lookup_latency(index, misses) * 1e6:>10.2f} "
+                  f"{lookup_latency(index, hits) * 1e6:>10.2f}")
+            checkpoint *= 10
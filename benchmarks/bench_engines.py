@@ -0,0 +1,83 @@
+''' Pages/sec of the threaded Worker against the asyncio engine, crawling a synthetic site on a local stub cache server.
+
+Usage: python -m benchmarks.bench_engines [--hosts H] [--pages P] [--latency S] [--threads T] [--concurrency C]
+'''
+import logging
+import os
+import tempfile
+import time
+from argparse import ArgumentParser
+from configparser import ConfigParser
+
+from utils.config import Config
+from crawler import Crawler
+from crawler.worker import Worker
+from crawler.async_worker import AsyncWorker
+from benchmarks.stub_server import StubCacheServer
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.ini")
+
+
+class AllowAllRobots(object):
+    ''' The synthetic hosts have no robots.txt to fetch. '''
+    def __init__(self, config, restart):
+        pass
+
+    def allowed(self, url):
+        return True
+
+
+def make_config(server, threads, engine, concurrency, options=None):
+    ''' config.ini pointed at the stub server, options maps (section, key) to extra overrides. '''
+    cparser = ConfigParser()
+    cparser.read(CONFIG_FILE)
+    cparser["CRAWLER"]["SEEDURL"] = ",".join(server.seed_urls())
+    cparser["CRAWLER"]["POLITENESS"] = "0"
+    cparser["LOCAL PROPERTIES"]["THREADCOUNT"] = str(threads)
+    cparser["LOCAL PROPERTIES"]["ENGINE"] = engine
+    cparser["LOCAL PROPERTIES"]["CONCURRENCY"] = str(concurrency)
+    for (section, key), value in (options or {}).items():
+        cparser[section][key] = value
+    config = Config(cparser)
+    config.cache_server = server.address
+    return config
+
+
+def crawl(config, **factories):
+    ''' Runs a fresh crawl with every save file in a temporary directory, returns how many seconds it took. '''
+    with tempfile.TemporaryDirectory() as directory:
+        for name, value in list(vars(config).items()):
+            if name.endswith(("_file", "_dir")) and value:
+                setattr(config, name, os.path.join(directory, value))
+        crawler = Crawler(config, True, robots_factory=AllowAllRobots, **factories)
+        start = time.time()
+        crawler.start()
+        elapsed = time.time() - start
+        # close the shelves while their directory still exists
+        for store in vars(crawler).values():
+            save = getattr(store, "save", None)
+            if save is not None:
+                save.close()
+        return elapsed
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    runs = [
+        ("threads", Worker, args.threads),
+        ("async", AsyncWorker, 1),
+    ]
+    for engine, worker, threads in runs:
+        server = StubCacheServer(args.hosts, args.pages, args.latency).start()
+        config = make_config(server, threads, engine, args.concurrency)
+        elapsed = crawl(config, worker_factory=worker)
+        server.stop()
+        print(f"{engine:>8}: {server.requests} pages in {elapsed:.2f}s, {server.requests / elapsed:.1f} pages/s")
@@ -0,0 +1,59 @@
+''' Parity and throughput of the html parser backends (utils/html_parsers.py) on saved pages.
+
+Usage: python -m benchmarks.bench_html_parsers path/to/saved/pages [--repeat N]
+Every backend is compared with bs4 on the text and links it extracts and on what the scraper derives from them
+(word counts and simhash fingerprint), then timed. EDGE_CASES are compared along with the saved pages.
+'''
+import time
+from argparse import ArgumentParser
+
+import scraper
+from utils.html_parsers import PARSERS
+from utils.simhash import generate_fingerprint
+from benchmarks.corpus import load_pages
+
+# markup the saved pages may not have, appended to them: numeric character references HTML5 reads as U+FFFD
+# (0, surrogates, past 0x10FFFF) or as windows-1252 (0x80-0x9F)
+EDGE_CASES = [
+    "<p>nul &#0; and &#x0; here</p>",
+    "<p>surrogates &#xD800; &#xDFFF; &#55296;</p>",
+    "<p>too large &#x110000; &#99999999999; &#x7FFFFFFF;</p>",
+    "<p>windows-1252 &#x80; &#150; &#129; &#13;</p>",
+    "<p>unterminated &#0 &#xD800 &#x110000x</p>",
+]
+
+
+def derived(text):
+    ''' What the scraper keeps of a page's text. '''
+    return scraper.wordFrequencies(text), generate_fingerprint(scraper.findWeights(text))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("corpus", type=str)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = [page.decode("utf-8", errors="ignore") for page in load_pages(args.corpus, args.limit)] + EDGE_CASES
+    expected = [PARSERS["bs4"](page) for page in pages]
+    expected_derived = [derived(text) for text, hrefs in expected]
+    print(f"{len(pages)} pages, backends: {', '.join(PARSERS)}")
+
+    baseline = None
+    for name, parse in PARSERS.items():
+        results = [parse(page) for page in pages]
+        same_text = sum(text == want[0] for (text, hrefs), want in zip(results, expected))
+        same_links = sum(hrefs == want[1] for (text, hrefs), want in zip(results, expected))
+        same_derived = sum(derived(text) == want for (text, hrefs), want in zip(results, expected_derived))
+
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for page in pages:
+                parse(page)
+            best = min(best, time.perf_counter() - start)
+        rate = len(pages) / best
+        baseline = baseline or rate
+        print(f"{name:>10}: {rate:7.1f} pages/s ({rate / baseline:.1f}x), same as bs4: text {same_text}, "
+              f"links {same_links}, word counts and fingerprint {same_derived} of {len(pages)}")
@@ -0,0 +1,100 @@
+''' Pages/sec of page analysis with the parser pool at 0 (worker threads only), 1, 2, ... processes.
+
+Usage: python -m benchmarks.bench_parse path/to/saved/pages [--threads T] [--processes 0,1,2,4] [--repeat N]
+Pages declaring a codec that is no text encoding (BAD_CHARSETS) are checked to decode as utf-8, then parsed
+along with the saved pages.
+'''
+import os
+import pickle
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+
+import requests
+
+from utils.config import Config
+from utils.response import Response
+from crawler.parser_pool import ParserPool
+from benchmarks.corpus import load_pages
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.ini")
+# codecs.lookup knows these, but they turn bytes into bytes, a page declaring one must still decode
+BAD_CHARSETS = ("rot13", "hex", "base64", "zip")
+
+
+def saved_response(index, content):
+    ''' A page the way the cache server sends it, before utils.response.Response unpacks it. '''
+    raw = requests.models.Response()
+    raw.status_code = 200
+    raw._content = content
+    url = raw.url = f"https://www.ics.uci.edu/page/{index}"
+    return {"url": url, "status": 200, "response": pickle.dumps(raw)}
+
+
+def bad_charset_pages():
+    ''' A page per BAD_CHARSETS in a <meta charset>, and the text it must decode to. '''
+    return [(f'<html><head><meta charset="{name}"></head><body><p>caf\u00e9 {name}</p></body></html>'.encode("utf-8"),
+             f"caf\u00e9 {name}") for name in BAD_CHARSETS]
+
+
+def check_bad_charsets():
+    for index, (content, text) in enumerate(bad_charset_pages()):
+        resp = Response(saved_response(index, content))
+        assert resp.encoding == "utf-8", f"{content[:60]} detected as {resp.encoding}"
+        assert text in resp.text, f"{content[:60]} decoded as {resp.text!r}"
+
+
+def analyze(pool, answer):
+    # a new Response every time, it caches its decoded text
+    return pool.analyze(Response(answer))
+
+
+def run(answers, threads, processes, repeat):
+    ''' Best pages/sec of `threads` worker threads parsing every answer through one ParserPool. '''
+    cparser = ConfigParser()
+    cparser.read(CONFIG_FILE)
+    cparser["LOCAL PROPERTIES"]["PARSEPROCESSES"] = str(processes)
+    cparser["LOCAL PROPERTIES"]["PARSEBACKLOG"] = str(2 * max(processes, 1))
+    pool = ParserPool(Config(cparser), False)
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as workers:
+            # warm up, the processes import bs4 and the scraper on their first page
+            list(workers.map(analyze, [pool] * threads, answers[:threads]))
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                pages = list(workers.map(analyze, [pool] * len(answers), answers))
+                best = min(best, time.perf_counter() - start)
+    finally:
+        pool.close()
+    return len(answers) / best, pages
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("corpus", type=str)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--processes", type=str, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = [int(count) for count in args.processes.split(",")] if args.processes else sorted(
+        {0, 1, 2, 4, cores} & set(range(cores + 1)))
+    check_bad_charsets()
+    pages = load_pages(args.corpus, args.limit) + [content for content, _ in bad_charset_pages()]
+    answers = [saved_response(index, page) for index, page in enumerate(pages)]
+    print(f"{len(answers)} pages, {args.threads} worker threads, {cores} cores")
+
+    baseline = expected = None
+    for processes in counts:
+        rate, pages = run(answers, args.threads, processes, args.repeat)
+        # the processes must return exactly what parsing in the thread returns
+        if expected is None:
+            expected = pages
+        assert pages == expected, f"{processes} processes gave different results"
+        baseline = baseline or rate
+        label = "threads only" if processes == 0 else f"{processes} processes"
+        print(f"{label:>14}: {rate:7.1f} pages/s ({rate / baseline:.2f}x)")
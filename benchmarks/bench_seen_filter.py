@@ -0,0 +1,77 @@
+''' Memory, false positive rate and speed of the frontier's seen filter, and how many shelve lookups it saves.
+
+Usage: python -m benchmarks.bench_seen_filter [urls.txt | frontier.shelve ...] [--size N] [--error-rate P]
+The urls (output.txt and report-2.txt by default) are replayed through add_url's checks in order.
+'''
+import dbm
+import os
+import random
+import shelve
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from utils import get_urlhash
+from utils.bloom import ScalableBloomFilter
+from utils.canonical import canonicalize
+from benchmarks.corpus import load_urls
+
+
+def timed(func, keys):
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("sources", nargs="*", default=[name for name in ("output.txt", "report-2.txt") if os.path.exists(name)])
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    args = parser.parse_args()
+
+    # memory and false positives at --size random url hashes
+    rnd = random.Random(0)
+    keys = [rnd.getrandbits(64) for _ in range(args.size)]
+    absent = [rnd.getrandbits(64) for _ in range(100000)]
+    seen = ScalableBloomFilter(args.size, args.error_rate)
+    add_time = timed(seen.add, keys)
+    check_time = timed(seen.__contains__, absent)
+    false_positives = sum(key in seen for key in absent)
+    print(f"{args.size} urls: {seen.nbytes / 2 ** 20:.2f} MB ({seen.nbytes / args.size * 1e6 / 2 ** 20:.2f} MB per million), "
+          f"{false_positives / len(absent):.4%} false positives")
+    print(f"add {add_time:.2f} us, check {check_time:.2f} us")
+
+    # the shelve lookup the filter stands in front of, on a shelve of the same urls
+    with tempfile.TemporaryDirectory() as directory:
+        save = shelve.open(os.path.join(directory, "frontier.shelve"))
+        hashes = [f"{key:064x}" for key in keys[:100000]]
+        for urlhash in hashes:
+            save[urlhash] = ("", False, 0)
+        save.sync()
+        lookup_time = timed(save.__contains__, [f"{key:064x}" for key in absent])
+        save.close()
+        backend = dbm.whichdb(os.path.join(directory, "frontier.shelve"))
+    # dbm.dumb keeps its whole index in memory, gdbm and ndbm look keys up on disk
+    print(f"shelve lookup {lookup_time:.2f} us ({backend}, warm cache)")
+
+    # replay a crawl's links in order, as add_url sees them
+    urls = [url for source in args.sources for url in load_urls(source)]
+    if urls:
+        seen = ScalableBloomFilter(args.size, args.error_rate)
+        exact = set()
+        avoided = false_positives = 0
+        for url in urls:
+            urlhash = get_urlhash(canonicalize(url))
+            key = int(urlhash[:16], 16)
+            if key in seen:
+                if urlhash in exact:
+                    continue
+                false_positives += 1
+            else:
+                avoided += 1
+            seen.add(key)
+            exact.add(urlhash)
+        print(f"{len(urls)} links replayed, {len(exact)} new: {avoided / len(urls):.1%} of the lookups avoided, "
+              f"{false_positives} false positives")
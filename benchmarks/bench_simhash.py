@@ -0,0 +1,78 @@
+''' Checks the integer simhash against the old bit-string implementation and times both.
+
+Usage: python -m benchmarks.bench_simhash path/to/saved/pages [--repeat N]
+'''
+import hashlib
+import time
+from argparse import ArgumentParser
+
+import numpy as np
+
+import scraper
+from utils.simhash import generate_fingerprint, similarity
+from benchmarks.corpus import load_pages, page_texts
+
+
+def legacy_fingerprint(weights):
+    ''' The old implementation: one SHA-256 bit string and 64 Python updates per token. '''
+    V = np.zeros(64, dtype=int)
+    for word, weight in weights.items():
+        hash_value = hashlib.sha256(word.encode()).digest()[:8]
+        hash = ''.join(f"{byte:08b}" for byte in hash_value)
+        for i, bit in enumerate(hash):
+            if bit == '1':
+                V[i] += weight
+            else:
+                V[i] -= weight
+    return np.where(V > 0, 1, 0)
+
+
+def legacy_similarity(fingerprint1, fingerprint2):
+    same_bits = sum(b1 == b2 for b1, b2 in zip(fingerprint1, fingerprint2))
+    return same_bits / 64.0
+
+
+def to_int(bit_array):
+    return int("".join(str(bit) for bit in bit_array), 2)
+
+
+def bench(func, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(*item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("corpus", type=str)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    weights = [scraper.findWeights(text) for text in page_texts(load_pages(args.corpus, args.limit))]
+
+    # compatibility: same fingerprints and same similarity scores as before
+    legacy = [legacy_fingerprint(weight) for weight in weights]
+    current = [generate_fingerprint(weight) for weight in weights]
+    mismatches = sum(to_int(old) != new for old, new in zip(legacy, current))
+    pairs = list(zip(range(len(weights)), range(1, len(weights))))
+    for i, j in pairs:
+        assert legacy_similarity(legacy[i], legacy[j]) == similarity(current[i], current[j])
+    print(f"{len(weights)} pages, {mismatches} fingerprint mismatches against the old implementation")
+    assert mismatches == 0, "fingerprints changed"
+
+    old_time = bench(legacy_fingerprint, [(weight,) for weight in weights], 1)
+    new_time = bench(generate_fingerprint, [(weight,) for weight in weights], args.repeat)
+    print(f"fingerprint legacy:  {old_time / len(weights) * 1000:.3f} ms/page")
+    print(f"fingerprint current: {new_time / len(weights) * 1000:.3f} ms/page ({old_time / new_time:.1f}x)")
+
+    old_pairs = [(legacy[i], legacy[j]) for i, j in pairs]
+    new_pairs = [(current[i], current[j]) for i, j in pairs]
+    old_time = bench(legacy_similarity, old_pairs, args.repeat)
+    new_time = bench(similarity, new_pairs, args.repeat)
+    print(f"similarity legacy:  {old_time / len(pairs) * 1e6:.2f} us/pair")
+    print(f"similarity current: {new_time / len(pairs) * 1e6:.2f} us/pair ({old_time / new_time:.1f}x)")
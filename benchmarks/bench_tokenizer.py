@@ -0,0 +1,76 @@
+''' Compares the regex tokenizer against the old character-by-character tokenizers.
+
+Usage: python -m benchmarks.bench_tokenizer path/to/saved/pages [--repeat N]
+'''
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+
+import scraper
+from utils.tokenizer import STOPWORDS
+from benchmarks.corpus import load_pages, page_texts
+
+
+def _legacy_tokens(text, with_punctuation):
+    all_tokens = []
+    token = ""
+    for c in text:
+        if (('A' <= c <= 'Z') or ('a' <= c <= 'z') or ('0' <= c <= '9')
+                or (with_punctuation and (c == "'" or c == "-"))):
+            token += c
+        else:
+            if token:
+                all_tokens.append(token.lower())
+                token = ""
+    if token:
+        all_tokens.append(token.lower())
+    return all_tokens
+
+
+def legacy_page(text):
+    ''' What the scraper used to do per page: three separate tokenizer passes. '''
+    stopwords = list(STOPWORDS)
+    words = _legacy_tokens(text, True)
+    frequencies = defaultdict(int)
+    for token in _legacy_tokens(text, True):
+        if token not in stopwords and len(token) > 1:
+            frequencies[token] += 1
+    weights = defaultdict(int)
+    for token in _legacy_tokens(text, False):
+        weights[token] += 1
+    return words, dict(frequencies), dict(weights)
+
+
+def current_page(text):
+    words = scraper.findWords(text)
+    return words, scraper.wordFrequencies(text, words), scraper.findWeights(text)
+
+
+def bench(func, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("corpus", type=str)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts = page_texts(load_pages(args.corpus, args.limit))
+    for text in texts:
+        assert legacy_page(text) == current_page(text), "tokenizer output changed"
+
+    legacy = bench(legacy_page, texts, args.repeat)
+    current = bench(current_page, texts, args.repeat)
+    chars = sum(len(text) for text in texts)
+    print(f"{len(texts)} pages, {chars} characters of text")
+    print(f"legacy:  {legacy:.3f}s ({len(texts) / legacy:.1f} pages/s)")
+    print(f"current: {current:.3f}s ({len(texts) / current:.1f} pages/s)")
+    print(f"speedup: {legacy / current:.1f}x")
@@ -0,0 +1,74 @@
+''' Times the compiled url filter against the old is_valid over the urls of a crawl, and lists where they disagree.
+
+Usage: python -m benchmarks.bench_url_filter [frontier.shelve | frontier.db | urls.txt ...] [--repeat N]
+Text files hold one url per line (anything after the url is ignored), so output.txt and report-2.txt work too.
+'''
+import os
+import re
+import time
+from argparse import ArgumentParser
+from urllib.parse import urlparse
+
+from utils.url_filter import UrlFilter
+from benchmarks.corpus import load_urls
+
+
+def legacy_is_valid(url):
+    ''' The old is_valid: the url is parsed, then every rule is scanned or matched one at a time. '''
+    url = url.replace('\u200E', '')
+    parsed = urlparse(url)
+    if parsed.scheme not in set(["http", "https"]):
+        return False
+    if re.search(r'/events/', url) or re.search(r'/calendar/', url):
+        return False
+    if any(word in url for word in ['gitlab.com']):
+        return False
+    query_banlist = ['edit', 'download', 'login', 'backlink', 'share', 'ical', 'id=', 'version=', 'history']
+    if any(word in parsed.query for word in query_banlist):
+        return False
+    if any(word in parsed.fragment for word in ['menu', 'L']):
+        return False
+    domains = ["ics.uci.edu", "cs.uci.edu", "informatics.uci.edu", "stat.uci.edu"]
+    if not any(domain in parsed.netloc for domain in domains):
+        return False
+    return not re.match(
+        r".*\.(css|js|bmp|gif|jpe?g|ico"
+        + r"|png|tiff?|mid|mp2|mp3|mp4"
+        + r"|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf"
+        + r"|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names"
+        + r"|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso"
+        + r"|epub|dll|cnf|tgz|sha1"
+        + r"|thmx|mso|arff|rtf|jar|csv"
+        + r"|rm|smil|wmv|swf|wma|zip|rar|gz)$", parsed.path.lower())
+
+
+def bench(func, urls, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(urls)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("sources", nargs="*", default=[name for name in ("output.txt", "report-2.txt") if os.path.exists(name)])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    urls = [url for source in args.sources for url in load_urls(source)]
+    if not urls:
+        raise SystemExit("No urls to filter")
+    url_filter = UrlFilter()
+
+    different = [url for url in urls if legacy_is_valid(url) != url_filter.is_valid(url)]
+    print(f"{len(urls)} urls, {sum(map(url_filter.is_valid, urls))} valid, {len(different)} decided differently")
+    # the old domain check was a substring test on the netloc, now the host must be the domain or a subdomain
+    for url in different[:10]:
+        print(f"  legacy {legacy_is_valid(url)}, compiled {url_filter.is_valid(url)}: {url}")
+
+    old_time = bench(lambda urls: [url for url in urls if legacy_is_valid(url)], urls, args.repeat)
+    new_time = bench(url_filter.filter_urls, urls, args.repeat)
+    print(f"legacy is_valid: {old_time / len(urls) * 1e6:.2f} us/url")
+    print(f"filter_urls:     {new_time / len(urls) * 1e6:.2f} us/url ({old_time / new_time:.1f}x)")
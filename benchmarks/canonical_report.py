@@ -0,0 +1,33 @@
+''' How many entries of existing save files url canonicalization collapses, i.e. how many fetches it would have saved.
+
+Usage: python -m benchmarks.canonical_report [frontier.shelve | frontier.db | urls.txt ...] [--examples N]
+Without arguments the urls of output.txt and report-2.txt are used.
+'''
+import os
+from argparse import ArgumentParser
+from collections import defaultdict
+
+from utils import get_urlhash, normalize
+from utils.canonical import canonicalize
+from benchmarks.corpus import load_urls
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("sources", nargs="*", default=[name for name in ("output.txt", "report-2.txt") if os.path.exists(name)])
+    parser.add_argument("--examples", type=int, default=10)
+    args = parser.parse_args()
+
+    for source in args.sources:
+        urls = load_urls(source)
+        # the frontier keys as they are now, and what they would be with canonicalization
+        keys = {get_urlhash(normalize(url)) for url in urls}
+        groups = defaultdict(set)
+        for url in urls:
+            groups[get_urlhash(canonicalize(url))].add(normalize(url))
+        collapsed = len(keys) - len(groups)
+        print(f"{source}: {len(urls)} urls, {len(keys)} frontier entries, {len(groups)} after canonicalization, "
+              f"{collapsed} collapsed ({collapsed / len(keys):.1%})")
+        merged = sorted((group for group in groups.values() if len(group) > 1), key=len, reverse=True)
+        for group in merged[:args.examples]:
+            print(f"  {len(group)} -> {canonicalize(next(iter(group)))}")
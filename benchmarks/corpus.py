@@ -0,0 +1,49 @@
+import os
+import shelve
+import sqlite3
+
+from bs4 import BeautifulSoup
+
+from utils.page_store import iter_pages, list_segments
+
+
+def load_pages(path, limit=None):
+    ''' Reads saved pages (every *.html / *.htm file under path, or the pages of a page store, PAGES in config.ini)
+    as raw bytes. '''
+    pages = []
+    if list_segments(path):
+        for page in iter_pages(path):
+            pages.append(page.content)
+            if limit and len(pages) >= limit:
+                break
+        return pages
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if not name.lower().endswith((".html", ".htm")):
+                continue
+            with open(os.path.join(root, name), "rb") as file:
+                pages.append(file.read())
+            if limit and len(pages) >= limit:
+                return pages
+    if not pages:
+        raise SystemExit(f"No saved pages found under {path}")
+    return pages
+
+
+def load_urls(path):
+    ''' The urls of a save file (a shelve of the frontier, unique pages or subdomains, or a sqlite frontier)
+    or of a text file. '''
+    if path.endswith(".txt"):
+        with open(path, encoding="utf-8", errors="ignore") as file:
+            return [line.split()[0] for line in file if line.startswith("http")]
+    if path.endswith(".db"):
+        with sqlite3.connect(path) as db:
+            return [url for url, in db.execute("SELECT url FROM urls")]
+    with shelve.open(path, "r") as save:
+        # frontier entries are (url, completed, depth), unique pages plain urls, subdomains (url, count)
+        return [value if isinstance(value, str) else value[0] for value in save.values()]
+
+
+def page_texts(pages):
+    ''' Extracts the visible text of each page the same way the scraper does. '''
+    return [BeautifulSoup(page.decode("utf-8", errors="ignore"), "html.parser").get_text() for page in pages]
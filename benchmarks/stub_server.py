@@ -0,0 +1,103 @@
+''' A local stand-in for the spacetime cache server, so crawls can be benchmarked without network access.
+
+Answers GET /?q=<url>&u=<agent> like the cache server does: a cbor map with the url, status and a pickled
+requests.Response. Pages are generated from the url, each with links to other pages of the same synthetic
+site (HOSTS subdomains of ics.uci.edu, PAGES pages each), so a crawl from the seeds always ends.
+With an archive (utils/archive.py, recorded by a real crawl with RECORD set) the recorded answers are served
+byte for byte instead, and urls that were not recorded get a 404 answer.
+'''
+import pickle
+import random
+import threading
+import time
+
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+import cbor
+import requests
+
+WORDS = ("crawler frontier politeness subdomain robots fingerprint token parser index queue host depth page link "
+         "search engine information retrieval student faculty research course lecture seminar graduate").split()
+
+
+def synthetic_page(url, hosts, pages, links=10):
+    ''' A deterministic page for url: a few hundred words and `links` links into the synthetic site. '''
+    rnd = random.Random(url)
+    words = " ".join(rnd.choice(WORDS) + str(rnd.randint(0, 10000)) for _ in range(rnd.randint(150, 600)))
+    anchors = "".join(
+        f"<li><a href='https://h{rnd.randrange(hosts)}.ics.uci.edu/p{rnd.randrange(pages)}'>next</a></li>"
+        for _ in range(links))
+    return f"<html><head><title>{url}</title></head><body><p>{words}</p><ul>{anchors}</ul></body></html>".encode()
+
+
+class _ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class StubCacheServer(object):
+    def __init__(self, hosts=20, pages=100, latency=0.0, port=0, responses=None, archive=None):
+        ''' latency: seconds every answer is delayed by, to stand in for the real cache server.
+        responses: optional callable url -> (status, content bytes), replaces the synthetic site.
+        archive: optional utils.archive.ResponseArchive to replay, replaces both. '''
+        self.hosts = hosts
+        self.pages = pages
+        self.latency = latency
+        self.responses = responses
+        self.archive = archive
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body go out in two writes, with Nagle on the body waits for the client's delayed ACK (~40 ms)
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                status, body = server.answer(query["q"][0])
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = _ThreadingServer(("127.0.0.1", port), Handler)
+        self.address = self.httpd.server_address
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def seed_urls(self):
+        return [f"https://h{host}.ics.uci.edu/p0" for host in range(self.hosts)]
+
+    def answer(self, url):
+        ''' (http status, cbor body) of the answer for url. '''
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.archive is not None:
+            recorded = self.archive.get(url)
+            if recorded is None:
+                return 200, cbor.dumps({"url": url, "status": 404, "error": f"{url} was not recorded"})
+            return recorded
+        if self.responses:
+            status, content = self.responses(url)
+        else:
+            status, content = 200, synthetic_page(url, self.hosts, self.pages)
+        raw = requests.models.Response()
+        raw.status_code = status
+        raw._content = content
+        raw.url = url
+        raw.headers["Content-Type"] = "text/html; charset=utf-8"
+        return 200, cbor.dumps({"url": url, "status": status, "response": pickle.dumps(raw)})
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,4 +1,8 @@
-import shelve
+from configparser import ConfigParser
+from argparse import ArgumentParser
+
+from utils.config import Config
+from crawler.subdomains import Subdomains
 
 if __name__ == "__main__":
     # url = "https://gitlab.com/aosp-mirror-1/platform/external/tagsoup/-/tree/main"
@@ -17,9 +21,13 @@ if __name__ == "__main__":
     # for url in sorted_items:
     #     print(url)
 
-    temp = shelve.open("subdomains.shelve")
-    print(len(temp))
-    sorted_items = sorted(temp.values(), key=lambda x: x[0])
-    for url, num in sorted_items:
+    parser = ArgumentParser()
+    parser.add_argument("--config_file", type=str, default="config.ini")
+    args = parser.parse_args()
+    cparser = ConfigParser()
+    cparser.read(args.config_file)
+    # the subdomains save file of config.ini, read once into memory and already sorted by url
+    subdomains = Subdomains(Config(cparser), False)
+    print(subdomains.count)
+    for url, num in subdomains.counts():
         print(url, num)
-    pass
\ No newline at end of file
@@ -1,22 +1,51 @@
-from utils import get_logger
+from utils import get_logger, configure_logging
+from utils import download
+import scraper
 from crawler.frontier import Frontier
 from crawler.worker import Worker
 from crawler.unique import Unique
 from crawler.subdomains import Subdomains
+from crawler.near_duplicates import NearDuplicates
+from crawler.frequencies import Frequencies
+from crawler.analytics import Analytics
+from crawler.robots import Robots
+from crawler.parser_pool import ParserPool
+from crawler.retries import Retries
+from crawler.traps import Traps
+from crawler.pages import PageStore
+from crawler.metrics import MetricsReporter
+from utils.metrics import metrics
 
 class Crawler(object):
-    def __init__(self, config, restart, frontier_factory=Frontier, worker_factory=Worker, unique_factory=Unique, subdomain_factory=Subdomains):
+    def __init__(self, config, restart, frontier_factory=Frontier, worker_factory=Worker, unique_factory=Unique, subdomain_factory=Subdomains, near_duplicate_factory=NearDuplicates, frequencies_factory=Frequencies, analytics_factory=Analytics, robots_factory=Robots, parser_factory=ParserPool, retries_factory=Retries, traps_factory=Traps, pages_factory=PageStore, metrics_factory=MetricsReporter):
         self.config = config
+        # [LOGGING] levels and sampling apply to the loggers created before this one too
+        configure_logging(config)
         self.logger = get_logger("CRAWLER")
+        # url rules first, the frontier filters the saved urls as it loads them
+        scraper.configure(config)
         self.frontier = frontier_factory(config, restart)
         self.unique = unique_factory(config, restart)
         self.subdomains = subdomain_factory(config, restart)
+        self.near_duplicates = near_duplicate_factory(config, restart)
+        self.frequencies = frequencies_factory(config, restart)
+        self.analytics = analytics_factory(config, restart)
+        self.robots = robots_factory(config, restart)
+        self.parser = parser_factory(config, restart)
+        self.retries = retries_factory(config, restart)
+        self.traps = traps_factory(config, restart)
+        self.pages = pages_factory(config, restart)
+        self.metrics = metrics_factory(config, restart)
+        if config.record_archive:
+            download.record_to(config.record_archive)
+            self.logger.info(f"Recording cache server answers to {config.record_archive}")
+        metrics.gauge("frontier_queued", lambda: len(self.frontier.to_be_downloaded))
         self.workers = list()
         self.worker_factory = worker_factory
 
     def start_async(self):
         self.workers = [
-            self.worker_factory(worker_id, self.config, self.frontier, self.unique, self.subdomains)
+            self.worker_factory(worker_id, self.config, self.frontier, self.unique, self.subdomains, self.near_duplicates, self.frequencies, self.analytics, self.robots, self.parser, self.retries, self.traps, self.pages)
             for worker_id in range(self.config.threads_count)]
         for worker in self.workers:
             worker.start()
@@ -26,5 +55,18 @@ class Crawler(object):
         self.join()
 
     def join(self):
-        for worker in self.workers:
-            worker.join()
+        try:
+            for worker in self.workers:
+                worker.join()
+        finally:
+            # write out whatever report data and frontier writes are still only in memory
+            self.frontier.flush()
+            self.unique.flush()
+            self.subdomains.flush()
+            self.frequencies.flush()
+            self.analytics.close()
+            self.parser.close()
+            self.traps.close()
+            self.pages.close()
+            self.metrics.close()
+            download.stop_recording()
@@ -0,0 +1,61 @@
+import json
+import os
+
+from threading import Thread
+from queue import Queue
+
+from utils import get_logger
+
+
+class Analytics(object):
+    ''' One record per crawled page (url, word count, text length, ratio, status, fetch time) for report 2 and for tuning
+    the length/ratio thresholds. Workers only put records on a bounded queue, a background thread batches them into
+    a JSON lines file, so the fetch loop never opens or writes files itself. '''
+    def __init__(self, config, restart):
+        self.logger = get_logger("ANALYTICS")
+        self.config = config
+        self.queue = Queue(maxsize=self.config.analytics_queue_size)
+
+        if os.path.exists(self.config.analytics_file) and restart:
+            # Save file does exists, but request to start from seed.
+            self.logger.info(
+                f"Found analytics file {self.config.analytics_file}, deleting it.")
+            os.remove(self.config.analytics_file)
+        self.file = open(self.config.analytics_file, "a")
+        self.writer = Thread(target=self._write_records, name="Analytics", daemon=True)
+        self.writer.start()
+
+    def record(self, url, status, fetch_time, page=None):
+        ''' Queues the record of one page. Blocks only if the writer has fallen a whole queue behind. '''
+        self.queue.put({
+            "url": url,
+            "status": status,
+            "fetch_time": round(fetch_time, 4),
+            "words": page["word_count"] if page else None,
+            "text_length": page["text_length"] if page else None,
+            "ratio": page["ratio"] if page else None,
+        })
+
+    def close(self):
+        ''' Writes out every queued record and stops the writer. '''
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        self.file.close()
+
+    def _write_records(self):
+        while True:
+            # wait for one record, then take whatever else is already queued and write them together
+            batch = [self.queue.get()]
+            while not self.queue.empty() and len(batch) < self.config.analytics_batch:
+                batch.append(self.queue.get_nowait())
+            stop = None in batch
+            records = [record for record in batch if record is not None]
+            try:
+                self.file.write("".join(json.dumps(record) + "\n" for record in records))
+                self.file.flush()
+            except Exception:
+                # the writer keeps draining the queue, if it died the workers would block on a full queue for good
+                self.logger.exception(f"Failed to write {len(records)} analytics records")
+            if stop:
+                return
@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from crawler.worker import Worker
+from utils import PER_URL
+import scraper
+from utils.download import async_download, get_async_session, stats as download_stats
+from utils.metrics import metrics
+
+
+class AsyncWorker(Worker):
+    ''' Worker that runs an asyncio event loop instead of one blocking fetch at a time. It keeps up to
+    config.concurrency downloads in flight through one aiohttp session to the cache server. Scraping and
+    bookkeeping (Worker.process_response) run in a bounded thread pool and robots.txt checks in another, so they
+    never block the loop, and politeness waits are asyncio timers on the frontier's per-host schedule instead of
+    sleeping threads. '''
+    def __init__(self, worker_id, config, frontier, unique, subdomains, near_duplicates, frequencies, analytics, robots, parser, retries, traps, pages):
+        super().__init__(worker_id, config, frontier, unique, subdomains, near_duplicates, frequencies, analytics, robots, parser, retries, traps, pages)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.config.executor_threads, thread_name_prefix=f"{self.name}-scraper")
+        # robots.txt fetches get their own threads, a few slow ones must not keep the frontier calls waiting
+        self.robots_executor = ThreadPoolExecutor(
+            max_workers=self.config.robots_threads, thread_name_prefix=f"{self.name}-robots")
+
+    def run(self):
+        try:
+            asyncio.run(self._crawl())
+        finally:
+            self.executor.shutdown()
+            self.robots_executor.shutdown()
+        # Log info
+        self.logger.info(f"Number of Unique Pages: {self.unique.count}")
+        self.logger.info(f"Number of subdomains: {self.subdomains.count}")
+        self.logger.info(f"Downloads: {download_stats.summary()}")
+        self.logger.info(f"Rejected before parsing: {scraper.content_filter.summary()}")
+
+    async def _crawl(self):
+        loop = asyncio.get_running_loop()
+        # set whenever a url is queued or done by any thread, so idle fetch loops wake up instead of polling
+        self.changed = asyncio.Event()
+        listener = lambda: loop.call_soon_threadsafe(self.changed.set)
+        self.frontier.add_listener(listener)
+        try:
+            async with get_async_session(self.config) as session:
+                await asyncio.gather(*(self._fetch_loop(session) for _ in range(self.config.concurrency)))
+        finally:
+            self.frontier.remove_listener(listener)
+        self.logger.info("Frontier is empty. Stopping Crawler.")
+
+    async def _fetch_loop(self, session):
+        loop = asyncio.get_running_loop()
+        while True:
+            # cleared before looking, a url queued or done after the look sets it again
+            self.changed.clear()
+            tbd_url, wait = self.frontier.try_get_tbd_url()
+            if tbd_url is None:
+                if wait is None:
+                    return
+                # nothing may be fetched yet, wake up when the next host is due or the queues change
+                try:
+                    await asyncio.wait_for(self.changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # the url is in flight from here on, whatever fails before the download must still mark it complete
+            try:
+                # Checking robots to see if crawling allowed, the cache may have to fetch it
+                start = time.perf_counter()
+                try:
+                    allowed = await loop.run_in_executor(self.robots_executor, self.robot_allowed, tbd_url)
+                except Exception as e:
+                    # robots.txt that can't be checked allows crawling, like a missing one
+                    self.logger.warning(f"Could not check robots.txt for {tbd_url}: {e}")
+                    allowed = True
+                metrics.observe("robots", time.perf_counter() - start)
+                if not allowed:
+                    self.logger.info(f"Skipping {tbd_url} due to robots.txt rules", extra=PER_URL)
+                    await loop.run_in_executor(self.executor, self.frontier.mark_url_complete, tbd_url)
+                    continue
+
+                # the frontier calls below take its lock, which executor threads hold while they add urls (and sync
+                # to disk), so they run in the executor too and never stall the other downloads on the loop
+                if await loop.run_in_executor(self.executor, self.trap_blocked, tbd_url):
+                    continue
+
+                # Getting the depth of the current url and adding 1
+                depth = await loop.run_in_executor(self.executor, self.frontier.get_depth, tbd_url) + 1
+            except Exception:
+                self.logger.exception(f"Failed to prepare {tbd_url}")
+                await loop.run_in_executor(self.executor, self.frontier.mark_url_complete, tbd_url)
+                continue
+
+            try:
+                # Download url
+                start = time.time()
+                resp = await async_download(session, tbd_url, self.config, self.logger)
+                fetch_time = time.time() - start
+                metrics.observe("download", fetch_time)
+                if self.download_failed(resp):
+                    await loop.run_in_executor(self.executor, self.handle_failure, tbd_url, resp, fetch_time)
+                    continue
+            except:
+                await loop.run_in_executor(self.executor, self.frontier.mark_url_complete, tbd_url)
+                continue
+
+            await loop.run_in_executor(self.executor, self.process_response, tbd_url, resp, depth, fetch_time)
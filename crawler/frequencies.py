@@ -0,0 +1,67 @@
+import os
+import shutil
+import time
+
+from collections import Counter
+from threading import RLock
+
+from utils import get_logger
+from utils.word_counts import write_run, merge_runs, list_runs
+
+
+class Frequencies(object):
+    ''' Word frequencies for report 3. Counts are aggregated in memory by all workers and flushed as sorted run files
+    into a directory every few pages or seconds, so a page never rewrites the whole vocabulary on disk. '''
+    def __init__(self, config, restart):
+        self.logger = get_logger("FREQUENCIES")
+        self.config = config
+        self.lock = RLock()
+        self.pending = Counter()
+        self.pending_pages = 0
+        self.last_flush = time.time()
+
+        if os.path.exists(self.config.frequencies_dir) and restart:
+            # Runs exist, but request to start from seed.
+            self.logger.info(
+                f"Found word frequencies {self.config.frequencies_dir}, deleting them.")
+            shutil.rmtree(self.config.frequencies_dir)
+        os.makedirs(self.config.frequencies_dir, exist_ok=True)
+        self.runs = list_runs(self.config.frequencies_dir)
+        self.next_run = int(os.path.basename(self.runs[-1]).split(".")[0]) + 1 if self.runs else 0
+        if self.runs:
+            self.logger.info(f"Found {len(self.runs)} word frequency runs in {self.config.frequencies_dir}.")
+
+    def add(self, frequencies):
+        ''' Adds the word counts of one page, flushing if enough pages or time have gone by. '''
+        with self.lock:
+            self.pending.update(frequencies)
+            self.pending_pages += 1
+            if (self.pending_pages >= self.config.flush_pages
+                    or time.time() - self.last_flush >= self.config.flush_interval):
+                self.flush()
+
+    def flush(self):
+        ''' Writes the counts gathered since the last flush as a new run. '''
+        with self.lock:
+            self.last_flush = time.time()
+            if not self.pending:
+                return
+            self.runs.append(self._write(sorted(self.pending.items())))
+            self.pending = Counter()
+            self.pending_pages = 0
+            if len(self.runs) > self.config.max_runs:
+                self._compact()
+
+    def _write(self, pairs):
+        path = os.path.join(self.config.frequencies_dir, f"{self.next_run:08d}.run")
+        self.next_run += 1
+        write_run(path, pairs)
+        return path
+
+    def _compact(self):
+        ''' Merges every run into one, streaming, so the number of open files stays bounded. '''
+        merged_path = self._write(merge_runs(self.runs))
+        for path in self.runs:
+            os.remove(path)
+        self.logger.info(f"Compacted {len(self.runs)} word frequency runs into {merged_path}")
+        self.runs = [merged_path]
@@ -1,17 +1,28 @@
 import os
+import pickle
 import shelve
 
 from threading import Thread, RLock
 from queue import Queue, Empty
 
-from utils import get_logger, get_urlhash, normalize
-from scraper import is_valid
+from utils import get_logger, get_urlhash
+from utils.canonical import canonicalize
+from utils.bloom import ScalableBloomFilter
+from utils.metrics import metrics
+from scraper import filter_urls
+from crawler.host_queues import HostQueues
 
 class Frontier(object):
     def __init__(self, config, restart):
         self.logger = get_logger("FRONTIER")
         self.config = config
-        self.to_be_downloaded = list()
+        # urls to download, queued per host so workers stay polite to each host
+        self.to_be_downloaded = HostQueues(self.config.time_delay)
+        self.lock = RLock()
+        # add_url counters: lookups the seen filter answered alone, lookups it sent to the shelve, false positives
+        self.lookups_avoided = 0
+        self.lookups = 0
+        self.false_positives = 0
         
         if not os.path.exists(self.config.save_file) and not restart:
             # Save file does not exist, but request to load save.
@@ -23,8 +34,12 @@ class Frontier(object):
             self.logger.info(
                 f"Found save file {self.config.save_file}, deleting it.")
             os.remove(self.config.save_file)
+            if os.path.exists(self.seen_file):
+                os.remove(self.seen_file)
         # Load existing save file, or create one if it does not exist.
         self.save = shelve.open(self.config.save_file)
+        # approximate set of the url hashes in the save file, checked before the shelve
+        self.seen = self._load_seen_filter()
         if restart:
             for url in self.config.seed_urls:
                 self.add_url(url, 0)
@@ -39,43 +54,110 @@ class Frontier(object):
         ''' This function can be overridden for alternate saving techniques. '''
         total_count = len(self.save)
         tbd_count = 0
-        for url, completed, depth in self.save.values():
-            if not completed and is_valid(url):
-                self.to_be_downloaded.append(url)
-                tbd_count += 1
+        pending = [url for url, completed, depth in self.save.values() if not completed]
+        for url in filter_urls(pending):
+            self.to_be_downloaded.put(url)
+            tbd_count += 1
         self.logger.info(
             f"Found {tbd_count} urls to be downloaded from {total_count} "
             f"total urls discovered.")
 
+    @property
+    def seen_file(self):
+        return self.config.save_file + ".seen"
+
+    def _load_seen_filter(self):
+        ''' The seen filter saved by flush() if it still matches the save file, otherwise rebuilt from its keys. '''
+        if os.path.exists(self.seen_file):
+            try:
+                with open(self.seen_file, "rb") as file:
+                    seen = pickle.load(file)
+                if len(seen) == len(self.save):
+                    return seen
+            except Exception as e:
+                self.logger.error(f"Could not load the seen filter {self.seen_file}: {e}")
+            self.logger.info(f"Seen filter {self.seen_file} is out of date, rebuilding it.")
+        seen = ScalableBloomFilter(self.config.bloom_capacity, self.config.bloom_error_rate)
+        for urlhash in self.save.keys():
+            seen.add(int(urlhash[:16], 16))
+        return seen
+
     def get_tbd_url(self):
-        try:
-            return self.to_be_downloaded.pop()
-        except IndexError:
-            return None
+        ''' Blocks until the host of some url may be fetched, returns None once the crawl is over. '''
+        return self.to_be_downloaded.get()
+
+    def try_get_tbd_url(self):
+        ''' Non-blocking get_tbd_url for event loops: (url, 0), (None, seconds to wait) or (None, None) once the crawl is over. '''
+        return self.to_be_downloaded.try_get()
+
+    def add_listener(self, callback):
+        ''' Calls callback() whenever a url is queued or done, from the thread that did it (see HostQueues.add_listener). '''
+        self.to_be_downloaded.add_listener(callback)
+
+    def remove_listener(self, callback):
+        self.to_be_downloaded.remove_listener(callback)
 
+    @metrics.timed("frontier_add_url")
     def add_url(self, url, depth):
-        url = normalize(url)
+        ''' Returns whether the url was new. '''
+        # one spelling per page, so fragment, query order, case and port variants are not fetched again
+        url = canonicalize(url)
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
+        key = int(urlhash[:16], 16)
+        with self.lock:
+            if key in self.seen:
+                # probably seen, only the shelve can tell for sure
+                self.lookups += 1
+                if urlhash in self.save:
+                    return False
+                self.false_positives += 1
+            else:
+                # definitely new, no shelve lookup needed
+                self.lookups_avoided += 1
+            self.seen.add(key)
             self.save[urlhash] = (url, False, depth)
             self.save.sync()
-            self.to_be_downloaded.append(url)
+            self.to_be_downloaded.put(url)
+            return True
     
+    @metrics.timed("frontier_mark_complete")
     def mark_url_complete(self, url):
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            # This should not happen.
-            self.logger.error(
-                f"Completed url {url}, but have not seen it before.")
+        with self.lock:
+            if urlhash not in self.save:
+                # This should not happen.
+                self.logger.error(
+                    f"Completed url {url}, but have not seen it before.")
 
-        self.save[urlhash] = (url, True, self.save[urlhash][2])
-        self.save.sync()
+            self.save[urlhash] = (url, True, self.save[urlhash][2])
+            self.save.sync()
+        # starts the politeness delay of the url's host
+        self.to_be_downloaded.done(url)
+
+    def retry_url(self, url, not_before):
+        ''' Hands a url whose download failed back to the queue, not to be fetched before not_before. It stays
+        pending in the save file, so it is retried after a restart too. '''
+        self.to_be_downloaded.retry(url, not_before)
+
+    def flush(self):
+        ''' Every shelve write is already synced, this saves the seen filter so a resume need not rebuild it. '''
+        with self.lock:
+            self.save.sync()
+            with open(self.seen_file + ".tmp", "wb") as file:
+                pickle.dump(self.seen, file, pickle.HIGHEST_PROTOCOL)
+            os.replace(self.seen_file + ".tmp", self.seen_file)
+            checked = self.lookups_avoided + self.lookups
+            self.logger.info(
+                f"Seen filter: {len(self.seen)} urls in {self.seen.nbytes / 2 ** 20:.1f} MB, "
+                f"{self.lookups_avoided / checked if checked else 0:.1%} of {checked} add_url lookups avoided, "
+                f"{self.false_positives} false positives.")
 
     def get_depth(self, url):
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            # This should not happen.
-            self.logger.error(
-                f"Trying to get depth of url {url}, but have not seen it before.")
+        with self.lock:
+            if urlhash not in self.save:
+                # This should not happen.
+                self.logger.error(
+                    f"Trying to get depth of url {url}, but have not seen it before.")
 
-        return self.save[urlhash][2]
+            return self.save[urlhash][2]
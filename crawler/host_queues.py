@@ -0,0 +1,114 @@
+import heapq
+import time
+
+from threading import Condition
+from urllib.parse import urlparse
+
+
+class HostQueues(object):
+    ''' The urls waiting to be downloaded, with one queue per host (netloc) so workers can be polite per host.
+    Hosts with waiting urls sit in a heap keyed by the next time they may be fetched. A host is handed to one
+    worker at a time, and becomes eligible again `delay` seconds after that worker marks its url done. '''
+    def __init__(self, delay):
+        self.delay = delay
+        self.condition = Condition()
+        self.queues = dict()        # host -> urls waiting, popped LIFO like the old list
+        self.ready = list()         # heap of (next allowed fetch time, host), for idle hosts with urls waiting
+        self.scheduled = set()      # hosts currently in the ready heap
+        self.next_fetch = dict()    # host -> next allowed fetch time
+        self.in_flight = dict()     # url -> host, handed to a worker and not done yet
+        self.busy = set()           # hosts of the urls in flight
+        self.delayed = list()       # heap of (not before, url), urls that may not be fetched yet at all
+        self.listeners = list()     # called on every put and done, for waiters that can't wait on the condition
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def put(self, url, not_before=0):
+        ''' Queues a url, optionally not to be handed out before the not_before timestamp. '''
+        with self.condition:
+            self.count += 1
+            if not_before > time.time():
+                heapq.heappush(self.delayed, (not_before, url))
+            else:
+                self._enqueue(url)
+            self.condition.notify()
+            self._notify_listeners()
+
+    def get(self, block=True):
+        ''' Returns the next url whose host may be fetched now. Blocks until there is one, unless block is False.
+        Returns None once nothing is waiting and nothing is in flight, meaning the crawl is over. '''
+        with self.condition:
+            while True:
+                url, wait = self.try_get()
+                if url is not None or wait is None or not block:
+                    return url
+                self.condition.wait(wait)
+
+    def try_get(self):
+        ''' Non-blocking get. Returns (url, 0) if a url is ready, (None, seconds) if the caller should wait that long
+        (or until notified) and (None, None) if the crawl is over. '''
+        with self.condition:
+            now = time.time()
+            while self.delayed and self.delayed[0][0] <= now:
+                self._enqueue(heapq.heappop(self.delayed)[1])
+            if self.ready and self.ready[0][0] <= now:
+                _, host = heapq.heappop(self.ready)
+                self.scheduled.discard(host)
+                url = self.queues[host].pop()
+                if not self.queues[host]:
+                    del self.queues[host]
+                self.in_flight[url] = host
+                self.busy.add(host)
+                self.count -= 1
+                return url, 0
+            if not self.ready and not self.delayed and not self.in_flight:
+                return None, None
+            wakeups = [entry[0] for entry in (self.ready[:1] + self.delayed[:1])]
+            # nothing scheduled means every waiting host is in flight, wait for a done()
+            return None, (min(wakeups) - now if wakeups else 1.0)
+
+    def done(self, url):
+        ''' Called once the worker is finished with a url, starts the politeness delay of its host. '''
+        with self.condition:
+            host = self.in_flight.pop(url, None)
+            if host is None:
+                return
+            self.busy.discard(host)
+            self.next_fetch[host] = time.time() + self.delay
+            if host in self.queues:
+                self._schedule(host)
+            self.condition.notify_all()
+            self._notify_listeners()
+
+    def retry(self, url, not_before):
+        ''' done(url), then put(url, not_before) in one step, so the crawl never looks over in between. '''
+        with self.condition:
+            self.done(url)
+            self.put(url, not_before)
+
+    def add_listener(self, callback):
+        ''' Calls callback(), from whichever thread changed the queues, after every put and done. Event loops use it
+        to wake up when a url may have become ready, instead of polling try_get. '''
+        with self.condition:
+            self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self.condition:
+            self.listeners.remove(callback)
+
+    def _notify_listeners(self):
+        for callback in self.listeners:
+            callback()
+
+    def _enqueue(self, url):
+        host = urlparse(url).netloc
+        self.queues.setdefault(host, list()).append(url)
+        if host not in self.busy:
+            self._schedule(host)
+
+    def _schedule(self, host):
+        if host not in self.scheduled:
+            self.scheduled.add(host)
+            heapq.heappush(self.ready, (self.next_fetch.get(host, 0), host))
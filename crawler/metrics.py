@@ -0,0 +1,91 @@
+import json
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Thread
+
+from utils import get_logger
+from utils.metrics import metrics, render
+
+# stages of a page in the order a worker goes through them, the summary shows the share of time each takes
+STAGES = ("robots", "download", "parse", "scrape", "frontier_add_url", "frontier_mark_complete")
+
+
+class MetricsReporter(object):
+    ''' Publishes utils.metrics: every METRICSINTERVAL seconds a summary line in the METRICS log (pages/sec,
+    queue depth, time per stage), and with METRICSPORT set a local endpoint, http://127.0.0.1:<port>/metrics
+    (text) and /metrics.json. Nothing is saved, the numbers start over with every crawl. '''
+    def __init__(self, config, restart):
+        self.logger = get_logger("METRICS")
+        self.config = config
+        self.stopped = Event()
+        self.last = None
+        metrics.reset()
+
+        self.reporter = None
+        if self.config.metrics_interval > 0:
+            self.reporter = Thread(target=self._report, name="Metrics", daemon=True)
+            self.reporter.start()
+        self.server = None
+        if self.config.metrics_port:
+            self.server = ThreadingHTTPServer(("127.0.0.1", self.config.metrics_port), _MetricsHandler)
+            self.server.daemon_threads = True
+            Thread(target=self.server.serve_forever, name="MetricsServer", daemon=True).start()
+            self.logger.info(f"Serving metrics on http://127.0.0.1:{self.server.server_address[1]}/metrics")
+
+    def close(self):
+        ''' Stops publishing and logs the totals of the whole crawl. '''
+        self.stopped.set()
+        if self.reporter is not None:
+            self.reporter.join()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        self.last = None
+        self.logger.info(f"Crawl totals: {self.summary(metrics.snapshot())}")
+
+    def summary(self, snapshot):
+        ''' One line: pages/sec since the previous summary, gauges, counters and the time split between stages. '''
+        pages = snapshot["counters"].get("pages", 0)
+        if self.last is None:
+            rate = pages / snapshot["uptime"] if snapshot["uptime"] else 0.0
+        else:
+            elapsed = snapshot["uptime"] - self.last["uptime"]
+            rate = (pages - self.last["counters"].get("pages", 0)) / elapsed if elapsed else 0.0
+        self.last = snapshot
+
+        parts = [f"{rate:.1f} pages/s"]
+        parts += [f"{name} {value}" for name, value in sorted(snapshot["gauges"].items())]
+        parts += [f"{name} {value}" for name, value in sorted(snapshot["counters"].items())]
+        latency = snapshot["latency"]
+        busy = sum(latency[stage]["total"] for stage in STAGES if stage in latency)
+        for stage in STAGES + tuple(sorted(set(latency) - set(STAGES))):
+            if stage in latency:
+                stats = latency[stage]
+                share = f" {stats['total'] / busy:.0%} of worker time," if stage in STAGES and busy else ""
+                parts.append(
+                    f"{stage}:{share} mean {stats['mean'] * 1000:.2f} ms, "
+                    f"p95 {stats['p95'] * 1000:.2f} ms, max {stats['max'] * 1000:.1f} ms")
+        return "; ".join(parts)
+
+    def _report(self):
+        while not self.stopped.wait(self.config.metrics_interval):
+            self.logger.info(self.summary(metrics.snapshot()))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = render(metrics.snapshot()).encode("utf-8"), "text/plain; charset=utf-8"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(metrics.snapshot()).encode("utf-8"), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
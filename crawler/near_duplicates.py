@@ -0,0 +1,50 @@
+import os
+import shelve
+
+from threading import RLock
+
+from utils import get_logger
+from utils.simhash import SimhashIndex
+
+
+class NearDuplicates(object):
+    ''' Same functionality as frontier. In shelve: stores fingerprints (as hex) as keys and the url they came from as values.
+    The fingerprints are also kept in a SimhashIndex shared by all workers, so a near-duplicate check does not scan every page crawled. '''
+    def __init__(self, config, restart):
+        self.logger = get_logger("NEAR_DUPLICATES")
+        self.config = config
+        self.lock = RLock()
+        self.index = SimhashIndex(self.config.duplicate_distance, self.config.duplicate_blocks)
+
+        if not os.path.exists(self.config.near_duplicate_file) and not restart:
+            # Save file does not exist, but request to load save.
+            self.logger.info(
+                f"Did not find near duplicate save file {self.config.near_duplicate_file}, "
+                f"starting from seed.")
+        elif os.path.exists(self.config.near_duplicate_file) and restart:
+            # Save file does exists, but request to start from seed.
+            self.logger.info(
+                f"Found near duplicate save file {self.config.near_duplicate_file}, deleting it.")
+            os.remove(self.config.near_duplicate_file)
+        # Load existing save file, or create one if it does not exist.
+        self.save = shelve.open(self.config.near_duplicate_file)
+        if not restart:
+            # Rebuild the index with contents of save file.
+            self._parse_save_file()
+
+    def _parse_save_file(self):
+        ''' Rebuilds the in-memory index from the fingerprints seen before the restart. '''
+        for key in self.save.keys():
+            self.index.add(int(key, 16))
+        self.logger.info(f"Loaded {len(self.index)} fingerprints of previously crawled pages.")
+
+    def find_or_add(self, fingerprint, url):
+        ''' Returns the url of an already crawled page within the distance threshold, otherwise remembers this page and returns None. '''
+        with self.lock:
+            match = self.index.find(fingerprint)
+            if match is not None:
+                return self.save.get(f"{match:016x}", "")
+            self.index.add(fingerprint)
+            self.save[f"{fingerprint:016x}"] = url
+            self.save.sync()
+            return None
@@ -0,0 +1,155 @@
+import os
+import shelve
+import time
+
+from threading import Thread
+from queue import Queue
+
+from utils import get_logger, get_urlhash
+from utils.page_store import (
+    CODECS, PageReader, compressor, encode_record, encode_segment_header, list_segments, segment_path)
+
+
+class PageStore(object):
+    ''' The bytes of every parsed page, kept for reprocessing (new reports, tokenizer or dedup threshold) without
+    crawling again. Workers only put pages on a bounded queue, a background thread compresses them and appends them
+    to segment files in batches (see utils/page_store.py for the format), syncing the index after each batch.
+    get(url) reads one page back, utils.page_store.iter_pages streams them all. With PAGES empty nothing is kept. '''
+    def __init__(self, config, restart):
+        self.logger = get_logger("PAGES")
+        self.config = config
+        self.enabled = bool(self.config.pages_dir)
+        if not self.enabled:
+            return
+        self.queue = Queue(maxsize=self.config.pages_queue_size)
+        self.codec = self.config.pages_compression
+        if self.codec not in CODECS:
+            self.logger.info(f"Compression {self.codec} is not available, using zlib")
+            self.codec = "zlib"
+        self.compress = compressor(self.codec)
+        self.stored = 0
+        self.raw_bytes = 0
+        self.written_bytes = 0
+
+        if list_segments(self.config.pages_dir) and restart:
+            # Pages exist, but request to start from seed.
+            self.logger.info(
+                f"Found page store {self.config.pages_dir}, deleting it.")
+            # only the store's own files, PAGES may name a directory with other things in it
+            for name in os.listdir(self.config.pages_dir):
+                if name.endswith(".seg") or name.startswith("index.shelve"):
+                    os.remove(os.path.join(self.config.pages_dir, name))
+        os.makedirs(self.config.pages_dir, exist_ok=True)
+        self.index = shelve.open(os.path.join(self.config.pages_dir, "index.shelve"))
+        self.reader = PageReader(self.config.pages_dir, self.index)
+        self._open_segment()
+        self.writer = Thread(target=self._write_pages, name="PageStore", daemon=True)
+        self.writer.start()
+
+    def add(self, url, resp):
+        ''' Queues the page of a response. Blocks only if the writer has fallen a whole queue behind. '''
+        if self.enabled:
+            self.queue.put((url, resp.status, time.time(), resp.headers.get("Content-Type"), resp.content))
+
+    def get(self, url):
+        ''' The stored page (utils.page_store.StoredPage) of url, if it has been written yet, or None. '''
+        return self.reader.get(url) if self.enabled else None
+
+    def close(self):
+        ''' Writes out every queued page and stops the writer. '''
+        if not self.enabled:
+            return
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        self.reader.close()
+        self.segment.close()
+        self.index.close()
+        if self.stored:
+            self.logger.info(
+                f"Stored {self.stored} pages, {self.raw_bytes / 2 ** 20:.1f} MB compressed to "
+                f"{self.written_bytes / 2 ** 20:.1f} MB with {self.codec}.")
+
+    def _open_segment(self):
+        ''' Appends to the last segment, cut back to its last indexed record in case a crash left half of one. '''
+        segments = list_segments(self.config.pages_dir)
+        self.number = segments[-1] if segments else 0
+        end = 0
+        for number, offset, size in self.index.values():
+            if number == self.number:
+                end = max(end, offset + size)
+        path = segment_path(self.config.pages_dir, self.number)
+        if not end or not os.path.exists(path):
+            self._new_segment(self.number)
+            return
+        self.segment = open(path, "r+b")
+        self.segment.truncate(end)
+        self.segment.seek(end)
+        self.offset = end
+
+    def _new_segment(self, number):
+        self.number = number
+        self.segment = open(segment_path(self.config.pages_dir, number), "wb")
+        self.segment.write(encode_segment_header(self.codec))
+        self.offset = self.segment.tell()
+
+    def _write_pages(self):
+        while True:
+            # wait for one page, then take whatever else is already queued and write them together
+            batch = [self.queue.get()]
+            while not self.queue.empty() and len(batch) < self.config.flush_pages:
+                batch.append(self.queue.get_nowait())
+            stop = None in batch
+            pages = [page for page in batch if page is not None]
+            try:
+                self._append(pages)
+            except Exception:
+                # the writer keeps draining the queue, if it died the workers would block on a full queue for good
+                self.logger.exception(f"Failed to store {len(pages)} pages")
+                self._recover()
+            if stop:
+                return
+
+    def _append(self, pages):
+        entries = {}
+        chunks = []
+        raw_bytes = written_bytes = 0
+        for url, status, fetched, content_type, content in pages:
+            if self.offset >= self.config.pages_segment_bytes:
+                self._flush_segment(chunks)
+                chunks = []
+                self.segment.close()
+                self._new_segment(self.number + 1)
+            try:
+                record = encode_record(self.compress, url, status, fetched, content_type, content)
+            except Exception:
+                # e.g. a url too long for the record header, only this page is lost
+                self.logger.exception(f"Failed to store {url[:200]}")
+                continue
+            entries[get_urlhash(url)] = (self.number, self.offset, len(record))
+            chunks.append(record)
+            self.offset += len(record)
+            raw_bytes += len(content)
+            written_bytes += len(record)
+        self._flush_segment(chunks)
+        # the index only names records that are already on disk
+        with self.reader.lock:
+            for urlhash, entry in entries.items():
+                self.index[urlhash] = entry
+            self.index.sync()
+        self.stored += len(entries)
+        self.raw_bytes += raw_bytes
+        self.written_bytes += written_bytes
+
+    def _recover(self):
+        ''' After a failed batch, cuts the segment back to its last indexed record, so no half-written record
+        is left in the middle of it, and appends from there. '''
+        try:
+            self.segment.close()
+            self._open_segment()
+        except Exception:
+            self.logger.exception("Failed to reopen the page store segment, pages are no longer stored")
+
+    def _flush_segment(self, chunks):
+        self.segment.write(b"".join(chunks))
+        self.segment.flush()
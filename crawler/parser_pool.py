@@ -0,0 +1,66 @@
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+
+from utils import get_logger
+from utils.metrics import metrics
+import scraper
+
+
+class ParserPool(object):
+    ''' Runs the CPU bound part of scraping (html parsing, tokenizing, simhash) in worker processes, so it is not
+    serialized by the GIL across worker threads. Only the raw page bytes go out and only the compact analysis
+    (links, word counts, fingerprint) comes back. With PARSEPROCESSES = 0 pages are parsed in the calling thread. '''
+    def __init__(self, config, restart):
+        self.logger = get_logger("PARSER")
+        self.config = config
+        self.lock = Lock()
+        self.pool = None
+        if self.config.parse_processes > 0:
+            # at most PARSEBACKLOG pages are sent to the processes at once, other workers wait for a slot
+            self.backlog = BoundedSemaphore(self.config.parse_backlog)
+            self.pool = self._new_pool()
+
+    def analyze(self, resp):
+        ''' scraper.analyze_page(resp), in a worker process if there is a pool. '''
+        if self.pool is None:
+            return scraper.analyze_page(resp)
+        if scraper.prefilter(resp) is not None:
+            # not worth sending to a process
+            return None
+        with self.backlog:
+            pool = self.pool
+            try:
+                # the bytes and their encoding go out, the process decodes them (a str would be decoded here, holding the GIL)
+                page, recorded = pool.submit(_analyze_content, resp.content, resp.url, resp.encoding).result()
+                metrics.replay(recorded)
+                return page
+            except BrokenProcessPool:
+                # a parser process died (e.g. killed for memory), start a new pool and parse this page here
+                self.logger.error(f"Parser process died while parsing {resp.url}, restarting the pool.")
+                with self.lock:
+                    if self.pool is pool:
+                        self.pool = self._new_pool()
+                return scraper.analyze_text(resp.text, resp.url)
+
+    def close(self):
+        ''' Waits for the pages being parsed and stops the processes. '''
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def _new_pool(self):
+        # spawn, forking a process that already runs worker threads can copy locks that are held
+        # (so every process loads the parser backend and limits of config.ini itself)
+        return ProcessPoolExecutor(
+            max_workers=self.config.parse_processes, mp_context=multiprocessing.get_context("spawn"),
+            initializer=scraper.configure, initargs=(self.config,))
+
+
+def _analyze_content(content, base_url, encoding):
+    ''' scraper.analyze_content in a parser process. The timings it records (e.g. fingerprint) come back with the
+    analysis, the process's own metrics are never reported. '''
+    with metrics.collect() as recorded:
+        page = scraper.analyze_content(content, base_url, encoding)
+    return page, recorded
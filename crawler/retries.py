@@ -0,0 +1,96 @@
+import os
+import random
+import shelve
+import math
+import time
+
+from email.utils import parsedate_to_datetime
+from threading import RLock
+
+from utils import get_logger, get_urlhash
+
+# statuses worth asking for again later, anything else (including a 3xx or 204 without a page) will not change by retrying
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504, 507, 509}
+# cache server errors (600-606) that describe a transient problem rather than a bad url
+TRANSIENT_ERRORS = ("timeout", "timed out", "temporarily", "unavailable", "connection", "reset", "refused")
+
+
+def is_retryable(status, error):
+    ''' Whether a download that failed with this status and error message may succeed later. '''
+    if status is None:
+        # the cache server never answered (timeout, connection error)
+        return True
+    if status >= 600:
+        return any(word in (error or "").lower() for word in TRANSIENT_ERRORS)
+    return status in RETRYABLE_STATUSES
+
+
+def parse_retry_after(resp):
+    ''' Seconds to wait from the Retry-After header of a response, given in seconds or as an HTTP date, at least 0.
+    None if there is no header or it can't be read. '''
+    try:
+        value = resp.headers["Retry-After"].strip()
+    except (AttributeError, KeyError, TypeError):
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, OverflowError):
+            return None
+    if math.isnan(seconds):
+        return None
+    return max(seconds, 0.0)
+
+
+class Retries(object):
+    ''' Decides what happens to urls whose download failed. Retryable failures get an exponential backoff
+    (with jitter, and at least the server's Retry-After up to RETRYMAXDELAY) and go back to the frontier, permanent ones and urls out
+    of attempts are recorded in a shelve: url hash -> (url, status, error, attempts). '''
+    def __init__(self, config, restart):
+        self.logger = get_logger("RETRIES")
+        self.config = config
+        # url -> failed attempts so far, only for urls waiting for a retry
+        self.attempts = dict()
+        self.lock = RLock()
+
+        if os.path.exists(self.config.failures_file) and restart:
+            # Save file does exists, but request to start from seed.
+            self.logger.info(
+                f"Found failures save file {self.config.failures_file}, deleting it.")
+            os.remove(self.config.failures_file)
+        self.save = shelve.open(self.config.failures_file)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.save)
+
+    def failed(self, url, resp):
+        ''' Records one failed download of url. Returns the time before which it must not be retried,
+        or None if it should not be retried, in which case the failure is saved. '''
+        status = resp.status if resp else None
+        error = resp.error if resp else None
+        with self.lock:
+            attempts = self.attempts.pop(url, 0) + 1
+            if is_retryable(status, error) and attempts <= self.config.retry_limit:
+                self.attempts[url] = attempts
+                return time.time() + self._backoff(attempts, resp)
+            self.save[get_urlhash(url)] = (url, status, error, attempts)
+            self.save.sync()
+        return None
+
+    def succeeded(self, url):
+        ''' Forgets the failed attempts of a url that was downloaded after all. '''
+        with self.lock:
+            self.attempts.pop(url, None)
+
+    def _backoff(self, attempts, resp):
+        delay = min(self.config.retry_backoff * 2 ** (attempts - 1), self.config.retry_max_delay)
+        # jitter so urls that failed together don't all come back at the same moment
+        delay *= random.uniform(0.5, 1.0)
+        # 429 and 503 answers may say how long to wait, but never longer than RETRYMAXDELAY
+        retry_after = parse_retry_after(resp)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.config.retry_max_delay))
+        return delay
@@ -0,0 +1,98 @@
+import os
+import shelve
+import time
+
+from threading import RLock, Event
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+from urllib.request import urlopen, Request
+from urllib.robotparser import RobotFileParser
+
+from utils import get_logger
+
+
+class Robots(object):
+    ''' Cache of parsed robots.txt files keyed by scheme://netloc, shared by all workers. In shelve: stores that key
+    and (fetch time, status, lines of the file) so the cache survives restarts.
+    Entries expire after config.robots_ttl seconds. Failed fetches (timeouts, connection errors) are cached too,
+    as "allow everything", for config.robots_error_ttl seconds. Concurrent lookups of a host that is being fetched
+    wait for that one fetch instead of starting their own. '''
+    def __init__(self, config, restart):
+        self.logger = get_logger("ROBOTS")
+        self.config = config
+        self.lock = RLock()
+        self.parsers = dict()       # key -> (expires at, RobotFileParser)
+        self.fetching = dict()      # key -> Event set once the fetch in progress is done
+
+        if os.path.exists(self.config.robots_file) and restart:
+            # Save file does exists, but request to start from seed.
+            self.logger.info(
+                f"Found robots save file {self.config.robots_file}, deleting it.")
+            os.remove(self.config.robots_file)
+        self.save = shelve.open(self.config.robots_file)
+
+    def allowed(self, url):
+        ''' Whether robots.txt of the url's host lets our user agent fetch the url. '''
+        parsed = urlparse(url)
+        key = parsed.scheme + "://" + parsed.netloc
+        return self._get_parser(key).can_fetch(self.config.user_agent, url)
+
+    def _get_parser(self, key):
+        while True:
+            with self.lock:
+                cached = self.parsers.get(key)
+                if cached and cached[0] > time.time():
+                    return cached[1]
+                saved = self.save.get(key)
+                if saved and self._expires(saved) > time.time():
+                    # fetched before the restart and still fresh
+                    parser = self._build(*saved)
+                    self.parsers[key] = (self._expires(saved), parser)
+                    return parser
+                done = self.fetching.get(key)
+                if done is None:
+                    done = self.fetching[key] = Event()
+                    break
+            # another worker is fetching this host's robots.txt, wait for it and read the cache again
+            done.wait(self.config.robots_timeout * 2)
+
+        try:
+            saved = self._fetch(key)
+            parser = self._build(*saved)
+            with self.lock:
+                self.save[key] = saved
+                self.save.sync()
+                self.parsers[key] = (self._expires(saved), parser)
+            return parser
+        finally:
+            with self.lock:
+                del self.fetching[key]
+            done.set()
+
+    def _fetch(self, key):
+        ''' Returns (fetch time, status, lines). Status is None if the fetch itself failed. '''
+        robots_url = key + "/robots.txt"
+        try:
+            request = Request(robots_url, headers={"User-Agent": self.config.user_agent})
+            with urlopen(request, timeout=self.config.robots_timeout) as response:
+                return time.time(), response.status, response.read().decode("utf-8", errors="ignore").splitlines()
+        except HTTPError as e:
+            return time.time(), e.code, []
+        except Exception as e:
+            self.logger.warning(f"Failed to fetch robots.txt for {key}: {e}")
+            return time.time(), None, []
+
+    def _expires(self, saved):
+        fetched_at, status, _ = saved
+        return fetched_at + (self.config.robots_ttl if status is not None else self.config.robots_error_ttl)
+
+    def _build(self, fetched_at, status, lines):
+        ''' Same rules as RobotFileParser.read(): 401/403 disallow everything, other errors allow everything. '''
+        parser = RobotFileParser()
+        if status in (401, 403):
+            parser.disallow_all = True
+        elif status is None or status >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse(lines)
+        return parser
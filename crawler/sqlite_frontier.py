@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import time
+
+from threading import RLock
+from urllib.parse import urlparse
+
+from utils import get_logger, get_urlhash
+from utils.canonical import canonicalize
+from utils.metrics import metrics
+from scraper import filter_urls
+from crawler.host_queues import HostQueues
+
+
+class SQLiteFrontier(object):
+    ''' Same interface as Frontier, stored in SQLite (WAL mode) instead of a shelve.
+    Writes are committed in batches of config.commit_every urls or every config.commit_interval seconds,
+    and completed/depth/host are indexed columns so a resume only reads the pending urls. '''
+    def __init__(self, config, restart):
+        self.logger = get_logger("FRONTIER")
+        self.config = config
+        # urls to download, queued per host so workers stay polite to each host
+        self.to_be_downloaded = HostQueues(self.config.time_delay)
+        self.lock = RLock()
+        self.uncommitted = 0
+        self.last_commit = time.time()
+
+        if not os.path.exists(self.config.save_file) and not restart:
+            # Save file does not exist, but request to load save.
+            self.logger.info(
+                f"Did not find save file {self.config.save_file}, "
+                f"starting from seed.")
+        elif os.path.exists(self.config.save_file) and restart:
+            # Save file does exists, but request to start from seed.
+            self.logger.info(
+                f"Found save file {self.config.save_file}, deleting it.")
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.config.save_file + suffix):
+                    os.remove(self.config.save_file + suffix)
+        # Load existing save file, or create one if it does not exist.
+        self.db = sqlite3.connect(self.config.save_file, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # with WAL, NORMAL only syncs at checkpoints, a crash can lose the last batch but never corrupts the file
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "urlhash TEXT PRIMARY KEY, url TEXT NOT NULL, completed INTEGER NOT NULL DEFAULT 0, "
+            "depth INTEGER NOT NULL, host TEXT NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS urls_completed ON urls (completed)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS urls_depth ON urls (depth)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS urls_host ON urls (host)")
+        self.db.commit()
+
+        if restart:
+            for url in self.config.seed_urls:
+                self.add_url(url, 0)
+        else:
+            # Set the frontier state with contents of save file.
+            self._parse_save_file()
+            if not self.to_be_downloaded and not self._total_count():
+                for url in self.config.seed_urls:
+                    self.add_url(url, 0)
+        self.flush()
+
+    def _total_count(self):
+        return self.db.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def _parse_save_file(self):
+        ''' Loads only the pending urls, through the completed index. '''
+        tbd_count = 0
+        pending = [url for url, in self.db.execute("SELECT url FROM urls WHERE completed = 0")]
+        for url in filter_urls(pending):
+            self.to_be_downloaded.put(url)
+            tbd_count += 1
+        self.logger.info(
+            f"Found {tbd_count} urls to be downloaded from {self._total_count()} "
+            f"total urls discovered.")
+
+    def get_tbd_url(self):
+        ''' Blocks until the host of some url may be fetched, returns None once the crawl is over. '''
+        return self.to_be_downloaded.get()
+
+    def try_get_tbd_url(self):
+        ''' Non-blocking get_tbd_url for event loops: (url, 0), (None, seconds to wait) or (None, None) once the crawl is over. '''
+        return self.to_be_downloaded.try_get()
+
+    def add_listener(self, callback):
+        ''' Calls callback() whenever a url is queued or done, from the thread that did it (see HostQueues.add_listener). '''
+        self.to_be_downloaded.add_listener(callback)
+
+    def remove_listener(self, callback):
+        self.to_be_downloaded.remove_listener(callback)
+
+    @metrics.timed("frontier_add_url")
+    def add_url(self, url, depth):
+        ''' Returns whether the url was new. '''
+        # one spelling per page, so fragment, query order, case and port variants are not fetched again
+        url = canonicalize(url)
+        urlhash = get_urlhash(url)
+        with self.lock:
+            # the primary key does the membership check, no separate lookup
+            inserted = self.db.execute(
+                "INSERT OR IGNORE INTO urls (urlhash, url, completed, depth, host) VALUES (?, ?, 0, ?, ?)",
+                (urlhash, url, depth, urlparse(url).netloc)).rowcount
+            if inserted:
+                self.to_be_downloaded.put(url)
+                self._wrote()
+        return bool(inserted)
+
+    @metrics.timed("frontier_mark_complete")
+    def mark_url_complete(self, url):
+        urlhash = get_urlhash(url)
+        with self.lock:
+            updated = self.db.execute(
+                "UPDATE urls SET completed = 1 WHERE urlhash = ?", (urlhash,)).rowcount
+            if not updated:
+                # This should not happen.
+                self.logger.error(
+                    f"Completed url {url}, but have not seen it before.")
+            self._wrote()
+        # starts the politeness delay of the url's host
+        self.to_be_downloaded.done(url)
+
+    def retry_url(self, url, not_before):
+        ''' Hands a url whose download failed back to the queue, not to be fetched before not_before. It stays
+        pending in the save file, so it is retried after a restart too. '''
+        self.to_be_downloaded.retry(url, not_before)
+
+    def get_depth(self, url):
+        urlhash = get_urlhash(url)
+        with self.lock:
+            row = self.db.execute("SELECT depth FROM urls WHERE urlhash = ?", (urlhash,)).fetchone()
+        if row is None:
+            # This should not happen.
+            self.logger.error(
+                f"Trying to get depth of url {url}, but have not seen it before.")
+            return 0
+        return row[0]
+
+    def _wrote(self):
+        ''' Commits once enough writes or time have accumulated. '''
+        self.uncommitted += 1
+        if (self.uncommitted >= self.config.commit_every
+                or time.time() - self.last_commit >= self.config.commit_interval):
+            self.flush()
+
+    def flush(self):
+        ''' Commits every pending write. '''
+        with self.lock:
+            self.db.commit()
+            self.uncommitted = 0
+            self.last_commit = time.time()
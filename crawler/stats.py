@@ -0,0 +1,57 @@
+import os
+import shelve
+import time
+
+from abc import ABC, abstractmethod
+from threading import RLock
+
+from utils import get_logger
+
+
+class StatsStore(ABC):
+    ''' A shelve of crawl statistics mirrored in memory and shared by all workers. Reads and counts come from memory,
+    changed entries are written back in batches after FLUSHPAGES updates or FLUSHINTERVAL seconds, and by flush()
+    when the crawl ends, instead of a write and sync per crawled page. Subclasses keep the entries in memory in _load. '''
+    def __init__(self, config, restart, name, save_file):
+        self.logger = get_logger(name)
+        self.config = config
+        self.lock = RLock()
+        self.dirty = {}
+        self.last_flush = time.time()
+
+        if not os.path.exists(save_file) and not restart:
+            # Save file does not exist, but request to load save.
+            self.logger.info(
+                f"Did not find {name.lower()} save file {save_file}, starting from seed.")
+        elif os.path.exists(save_file) and restart:
+            # Save file does exists, but request to start from seed.
+            self.logger.info(
+                f"Found {name.lower()} save file {save_file}, deleting it.")
+            os.remove(save_file)
+        # Load existing save file, or create one if it does not exist.
+        self.save = shelve.open(save_file)
+        # the only pass over the shelve, everything after this is answered from memory
+        for key, value in self.save.items():
+            self._load(key, value)
+
+    @abstractmethod
+    def _load(self, key, value):
+        ''' Takes one saved entry into memory, called for each when the store opens. '''
+
+    def _put(self, key, value):
+        ''' Queues an entry for the next flush, call with the lock held. '''
+        self.dirty[key] = value
+        if (len(self.dirty) >= self.config.flush_pages
+                or time.time() - self.last_flush >= self.config.flush_interval):
+            self.flush()
+
+    def flush(self):
+        ''' Writes the entries changed since the last flush. '''
+        with self.lock:
+            self.last_flush = time.time()
+            if not self.dirty:
+                return
+            for key, value in self.dirty.items():
+                self.save[key] = value
+            self.save.sync()
+            self.dirty = {}
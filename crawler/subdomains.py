@@ -1,59 +1,43 @@
-import os
-import shelve
-
-from threading import Thread, RLock
-from queue import Queue, Empty
-
-from utils import get_logger, get_urlhash, normalize
-from scraper import is_valid
-
 from urllib.parse import urlparse
 
-class Subdomains(object):
-    ''' Same functionality as frontier. In shelve: stores url hashes as keys and urls, number of unique links with that subdomain as values. '''
+from utils import get_urlhash, normalize
+from crawler.stats import StatsStore
+
+class Subdomains(StatsStore):
+    ''' Pages crawled per subdomain, kept in memory (see crawler/stats.py). In shelve: stores url hashes as keys and urls, number of unique links with that subdomain as values. '''
     def __init__(self, config, restart):
-        self.logger = get_logger("SUBDOMAINS")
-        self.config = config
-        self.count = 0
-        
-        if not os.path.exists(self.config.subdomain_file) and not restart:
-            # Save file does not exist, but request to load save.
-            self.logger.info(
-                f"Did not find subdomain save file {self.config.subdomain_file}, "
-                f"starting from seed.")
-        elif os.path.exists(self.config.subdomain_file) and restart:
-            # Save file does exists, but request to start from seed.
-            self.logger.info(
-                f"Found subdomain save file {self.config.subdomain_file}, deleting it.")
-            os.remove(self.config.subdomain_file)
-        # Load existing save file, or create one if it does not exist.
-        self.save = shelve.open(self.config.subdomain_file)
-        if restart:
+        self.pages = {}     # get_urlhash(subdomain url) -> (subdomain url, pages crawled), the shelve entries
+        super().__init__(config, restart, "SUBDOMAINS", config.subdomain_file)
+        if restart or not self.pages:
             for url in self.config.seed_urls:
                 self.add_if_new_subdomain(url)
-        else:
-            # Set the subdomains state with contents of save file.
-            self._parse_save_file()
-            if not self.save:
-                for url in self.config.seed_urls:
-                    self.add_if_new_subdomain(url)
 
-    def _parse_save_file(self):
-        ''' Restores the total count value. '''
-        total_count = len(self.save)
-        self.count = total_count
+    def _load(self, urlhash, entry):
+        self.pages[urlhash] = entry
+
+    @property
+    def count(self):
+        ''' Number of subdomains. '''
+        return len(self.pages)
+
+    def pages_of(self, base_url):
+        ''' Pages crawled on one subdomain, e.g. "https://vision.ics.uci.edu". '''
+        with self.lock:
+            return self.pages.get(get_urlhash(base_url), (base_url, 0))[1]
+
+    def counts(self):
+        ''' (subdomain url, pages) of every subdomain, sorted by url. '''
+        with self.lock:
+            return sorted(self.pages.values())
 
     def add_if_new_subdomain(self, url):
         ''' Gets just the subdomain, then adds if new and updates if already exists. '''
         url = normalize(url)
         parsed_url = urlparse(url)
         base_url = parsed_url.scheme + "://" + parsed_url.netloc
+        # keyed like the shelve, without the scheme, so http and https pages of a host count together
         urlhash = get_urlhash(base_url)
-        if urlhash not in self.save:
-            self.save[urlhash] = (base_url, 1)
-            self.save.sync()
-            self.count += 1
-        else:
-            num = self.save[urlhash][1] + 1
-            self.save[urlhash] = (base_url, num)
-            self.save.sync()
+        with self.lock:
+            num = self.pages.get(urlhash, (base_url, 0))[1] + 1
+            self.pages[urlhash] = (base_url, num)
+            self._put(urlhash, (base_url, num))
@@ -0,0 +1,143 @@
+import os
+import re
+import shelve
+
+from collections import Counter, defaultdict
+from threading import RLock
+from urllib.parse import urlsplit
+
+from utils import get_logger
+
+# a path segment made of an id rather than a word: long hex/alphanumeric runs with digits in them
+ID_SEGMENT = re.compile(r"^(?=.*\d)[0-9a-zA-Z_-]{16,}$")
+NUMBER = re.compile(r"\d+")
+
+
+def url_template(url):
+    ''' The pattern a url shares with its trap siblings: host, path with numbers and ids masked, sorted query keys.
+    https://wiki.ics.uci.edu/doku.php/a:2019-01?rev=123&do=diff -> wiki.ics.uci.edu/doku.php/a:<n>-<n>?do&rev '''
+    parsed = urlsplit(url)
+    segments = ["<id>" if ID_SEGMENT.match(segment) else NUMBER.sub("<n>", segment)
+                for segment in parsed.path.split("/")]
+    keys = sorted({pair.split("=", 1)[0] for pair in parsed.query.split("&") if pair})
+    return parsed.netloc.lower() + "/".join(segments) + ("?" + "&".join(keys) if keys else "")
+
+
+class TemplateStats(object):
+    __slots__ = ("admitted", "fetched", "bad")
+
+    def __init__(self):
+        self.admitted = 0   # urls of the template added to the frontier
+        self.fetched = 0    # pages of the template crawled
+        self.bad = 0        # of those, near duplicates, low information, too small/large or unparseable
+
+
+class Traps(object):
+    ''' Online crawler trap detection from url pattern statistics, shared by all workers.
+    Links are refused before they reach the frontier if they are too deep, repeat a path segment, bring yet another
+    value of a query parameter that already took too many, or belong to a path template (see url_template) that looks
+    like a trap so far and has too many urls waiting. A template whose crawled pages are mostly near duplicates or low information is blocked,
+    and its urls already in the frontier are skipped. In shelve: blocked templates and why, so blocks survive restarts. '''
+    def __init__(self, config, restart):
+        self.logger = get_logger("TRAPS")
+        self.config = config
+        self.lock = RLock()
+        self.templates = defaultdict(TemplateStats)
+        self.hosts = defaultdict(TemplateStats)
+        self.query_values = defaultdict(set)    # (host and path, query key) -> values added, up to the limit
+        self.refused = Counter()                # reason -> links refused
+        self.reported = set()                   # patterns whose refusal was already logged
+
+        if os.path.exists(self.config.traps_file) and restart:
+            # Save file does exists, but request to start from seed.
+            self.logger.info(
+                f"Found traps save file {self.config.traps_file}, deleting it.")
+            os.remove(self.config.traps_file)
+        self.save = shelve.open(self.config.traps_file)
+        self.blocked = dict(self.save.items())
+        if self.blocked:
+            self.logger.info(f"Loaded {len(self.blocked)} blocked url templates.")
+
+    def check(self, url, depth):
+        ''' Why a link should not be added to the frontier, or None if it may be. '''
+        parsed = urlsplit(url)
+        template = url_template(url)
+        with self.lock:
+            if template in self.blocked:
+                return self._refuse("blocked template", template, url)
+            if self.config.trap_max_depth and depth > self.config.trap_max_depth:
+                return self._refuse("too deep", template, url)
+            segments = [segment for segment in parsed.path.split("/") if segment]
+            if segments and max(Counter(segments).values()) >= self.config.trap_repeats:
+                return self._refuse("repeating path segment", template, url)
+            for key, value in self._query_pairs(parsed):
+                values = self.query_values[(parsed.netloc, parsed.path, key)]
+                if value not in values and len(values) >= self.config.trap_query_values:
+                    return self._refuse(f"too many values of query parameter {key}", template, url)
+            stats = self.templates[template]
+            # only a template whose crawled pages are mostly bad so far is throttled, a refused link is dropped for
+            # good and a template that is just busy would lose urls it can never find again
+            suspicious = stats.bad and stats.bad >= self.config.trap_bad_ratio * stats.fetched
+            if suspicious and stats.admitted - stats.fetched >= self.config.trap_template_backlog:
+                # throttled until the urls already waiting have been crawled (and found to be good)
+                return self._refuse("template backlog", template, url)
+        return None
+
+    def added(self, url):
+        ''' Counts a link the frontier took after check() let it through, and its query values. Links the frontier
+        turns down (already seen, filtered out) don't count towards any limit. '''
+        parsed = urlsplit(url)
+        with self.lock:
+            self.templates[url_template(url)].admitted += 1
+            self.hosts[parsed.netloc].admitted += 1
+            for key, value in self._query_pairs(parsed):
+                values = self.query_values[(parsed.netloc, parsed.path, key)]
+                if len(values) < self.config.trap_query_values:
+                    values.add(value)
+
+    def blocked_reason(self, url):
+        ''' Why a url taken from the frontier should not be fetched, or None. '''
+        with self.lock:
+            return self.blocked.get(url_template(url))
+
+    def record(self, url, page):
+        ''' Counts the outcome of a crawled page and blocks its template if it keeps producing bad pages. '''
+        bad = page is None or "filtered" in page
+        template = url_template(url)
+        with self.lock:
+            for stats in (self.templates[template], self.hosts[urlsplit(url).netloc]):
+                stats.fetched += 1
+                stats.bad += bad
+            stats = self.templates[template]
+            if (template not in self.blocked and stats.fetched >= self.config.trap_min_pages
+                    and stats.bad >= self.config.trap_bad_ratio * stats.fetched):
+                reason = f"{stats.bad} of {stats.fetched} pages near duplicate or low information"
+                self.blocked[template] = reason
+                self.save[template] = reason
+                self.save.sync()
+                self.logger.info(f"Blocking url template {template}: {reason}")
+
+    def close(self):
+        ''' Logs how many links each rule refused and the hosts with the most bad pages. '''
+        with self.lock:
+            self.save.sync()
+            for reason, count in self.refused.most_common():
+                self.logger.info(f"Refused {count} links: {reason}")
+            worst = sorted(self.hosts.items(), key=lambda item: item[1].bad, reverse=True)[:10]
+            for host, stats in worst:
+                if stats.bad:
+                    self.logger.info(f"{host}: {stats.bad} bad of {stats.fetched} pages, {stats.admitted} urls added")
+
+    def _query_pairs(self, parsed):
+        for pair in parsed.query.split("&"):
+            if pair:
+                key, _, value = pair.partition("=")
+                yield key, value
+
+    def _refuse(self, reason, template, url):
+        self.refused[reason] += 1
+        if (reason, template) not in self.reported:
+            # log each rule once per template, not once per link
+            self.reported.add((reason, template))
+            self.logger.info(f"Refusing {url} ({reason}), template {template}")
+        return reason
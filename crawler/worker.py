@@ -1,19 +1,18 @@
 from threading import Thread
 
 from inspect import getsource
-from utils.download import download
-from utils import get_logger
+from utils.download import download, stats as download_stats
+from utils import get_logger, PER_URL
+from utils.metrics import metrics
 import scraper
 import time
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
 from urllib.request import urlopen
-from urllib.robotparser import RobotFileParser
-import socket
 from bs4 import BeautifulSoup
 
 
 class Worker(Thread):
-    def __init__(self, worker_id, config, frontier, unique, subdomains):
+    def __init__(self, worker_id, config, frontier, unique, subdomains, near_duplicates, frequencies, analytics, robots, parser, retries, traps, pages):
         self.logger = get_logger(f"Worker-{worker_id}", "Worker")
         self.config = config
         self.frontier = frontier
@@ -21,108 +20,162 @@ class Worker(Thread):
         self.unique = unique
         # shelve to keep track of unique subdomains and count
         self.subdomains = subdomains
+        # fingerprints of crawled pages shared by all workers, to filter out near duplicates
+        self.near_duplicates = near_duplicates
+        # word frequencies of every page for report 3, shared by all workers
+        self.frequencies = frequencies
+        # per page records for report 2 and the length/ratio thresholds
+        self.analytics = analytics
+        # robots.txt cache shared by all workers
+        self.robots = robots
+        # parses pages, in worker processes if PARSEPROCESSES is set (crawler/parser_pool.py)
+        self.parser = parser
+        # backoff for failed downloads, and the record of urls that will never download
+        self.retries = retries
+        # url pattern statistics that keep crawler traps out of the frontier
+        self.traps = traps
+        # compressed copies of the parsed pages, for reprocessing without crawling again
+        self.pages = pages
         # basic check for requests in scraper
         assert {getsource(scraper).find(req) for req in {"from requests import", "import requests"}} == {-1}, "Do not use requests in scraper.py"
         assert {getsource(scraper).find(req) for req in {"from urllib.request import", "import urllib.request"}} == {-1}, "Do not use urllib.request in scraper.py"
         super().__init__(daemon=True)
         
     def run(self):
-        # List to store fingerprints for future comparison
-        final_lst = []
         while True:
             tbd_url = self.frontier.get_tbd_url()
             if not tbd_url:
                 self.logger.info("Frontier is empty. Stopping Crawler.")
                 break
 
+            # the url is in flight from here on, whatever fails before the download must still mark it complete
+            # or its host stays busy and the other workers wait for good (process_response guards the rest)
             try:
                 # Checking robots to see if crawling allowed
-                parsed_url = urlparse(tbd_url)
-                base_url = parsed_url.scheme + "://" + parsed_url.netloc
-                if not self.robot_allowed(base_url):
-                    self.logger.info(f"Skipping {tbd_url} due to robots.txt rules")
+                try:
+                    with metrics.timer("robots"):
+                        allowed = self.robot_allowed(tbd_url)
+                except Exception as e:
+                    # robots.txt that can't be checked allows crawling, like a missing one
+                    self.logger.warning(f"Could not check robots.txt for {tbd_url}: {e}")
+                    allowed = True
+                if not allowed:
+                    self.logger.info(f"Skipping {tbd_url} due to robots.txt rules", extra=PER_URL)
                     self.frontier.mark_url_complete(tbd_url)
                     continue
-            except:
-                pass
 
-            # Getting the depth of the current url and adding 1
-            depth = self.frontier.get_depth(tbd_url) + 1
-            # # If depth of url is greater than 120, probably a trap, so skip
-            # if depth > 120:
-            #     self.logger.info(f"Skipping {tbd_url} due to depth limit")
-            #     self.frontier.mark_url_complete(tbd_url)
-            #     continue
+                if self.trap_blocked(tbd_url):
+                    continue
+
+                # Getting the depth of the current url and adding 1
+                # (links deeper than TRAPMAXDEPTH are refused by the trap detector)
+                depth = self.frontier.get_depth(tbd_url) + 1
+            except Exception:
+                self.logger.exception(f"Failed to prepare {tbd_url}")
+                self.frontier.mark_url_complete(tbd_url)
+                continue
 
             try:
                 # Download url
+                start = time.time()
                 resp = download(tbd_url, self.config, self.logger)
-                # if error, try to download again, max 5 times before moving on
-                if not resp or not resp.raw_response:
-                    for _ in range(5):
-                        resp = download(tbd_url, self.config, self.logger)
-                        if resp  and resp.raw_response:
-                            break
-                if not resp or not resp.raw_response:
-                    self.frontier.mark_url_complete(tbd_url)
+                fetch_time = time.time() - start
+                metrics.observe("download", fetch_time)
+                if self.download_failed(resp):
+                    self.handle_failure(tbd_url, resp, fetch_time)
                     continue
             except:
                 self.frontier.mark_url_complete(tbd_url)
                 continue
 
+            self.process_response(tbd_url, resp, depth, fetch_time)
+
+            # (politeness: the frontier waits time_delay before handing out this url's host again)
+        # Log info
+        self.logger.info(f"Number of Unique Pages: {self.unique.count}")
+        self.logger.info(f"Number of subdomains: {self.subdomains.count}")
+        self.logger.info(f"Downloads: {download_stats.summary()}")
+        self.logger.info(f"Rejected before parsing: {scraper.content_filter.summary()}")
+
+    def trap_blocked(self, tbd_url):
+        ''' Skips a url whose template was blocked as a trap after it entered the frontier. '''
+        reason = self.traps.blocked_reason(tbd_url)
+        if reason is None:
+            return False
+        self.logger.info(f"Skipping {tbd_url} due to trap detection ({reason})", extra=PER_URL)
+        self.frontier.mark_url_complete(tbd_url)
+        return True
+
+    def download_failed(self, resp):
+        ''' No page, or an http error status. '''
+        # the status first, an error answer's pickled response is never unpickled
+        return not resp or resp.status is None or resp.status >= 400 or not resp.raw_response
+
+    def handle_failure(self, tbd_url, resp, fetch_time):
+        ''' Puts the url back in the frontier with a backoff if the error may be transient, otherwise records
+        the failure and marks it complete. The worker moves on to other urls either way. '''
+        not_before = self.retries.failed(tbd_url, resp)
+        metrics.incr("retried" if not_before is not None else "failed")
+        if not_before is not None:
             self.logger.info(
-                f"Downloaded {tbd_url}, status <{resp.status}>., "
-                f"using cache {self.config.cache_server}.")
-            
+                f"Retrying {tbd_url} (status <{resp.status if resp else None}>) in {not_before - time.time():.1f}s",
+                extra=PER_URL)
+            self.frontier.retry_url(tbd_url, not_before)
+            return
+        self.analytics.record(tbd_url, resp.status if resp else None, fetch_time)
+        self.frontier.mark_url_complete(tbd_url)
+
+    def process_response(self, tbd_url, resp, depth, fetch_time):
+        ''' Scrapes a downloaded page, records it for the reports and adds its links to the frontier. '''
+        self.logger.info(
+            f"Downloaded {tbd_url}, status <{resp.status}>., "
+            f"using cache {self.config.cache_server}.", extra=PER_URL)
+
+        # a url that is never marked complete would keep its host busy and the other workers waiting,
+        # so it is marked complete whatever fails below
+        try:
+            self.retries.succeeded(tbd_url)
             # Scraped urls
-            scraped_urls, final_lst = scraper.scraper(tbd_url, resp, final_lst)
+            with metrics.timer("parse"):
+                page = self.parser.analyze(resp)
+            # no analysis means the page was rejected before parsing, or could not be parsed
+            scraped_urls = []
+            if page is not None:
+                with metrics.timer("scrape"):
+                    scraped_urls, page = scraper.scraper(tbd_url, resp, self.near_duplicates, page)
+            metrics.incr("pages")
+            if page is None or "filtered" in page:
+                reason = "rejected before parsing" if page is None else page["filtered"]
+                metrics.incr("filtered_" + reason.replace(" ", "_"))
+            # prep output for report 2
+            self.analytics.record(tbd_url, resp.status, fetch_time, page)
+            self.traps.record(tbd_url, page)
+            if page is not None:
+                # prep output for report 3
+                self.frequencies.add(page["frequencies"])
+                self.pages.add(tbd_url, resp)
 
             # If the url was scraped, add to unique list and unique subdomains list if new
             if len(scraped_urls) > 0:
                 self.unique.add_if_unique(tbd_url)
                 self.subdomains.add_if_new_subdomain(tbd_url)
 
-            # Add new urls to frontier
+            # Add new urls to frontier, unless they look like a crawler trap
+            added = 0
             for scraped_url in scraped_urls:
-                self.frontier.add_url(scraped_url, depth)
-            self.frontier.mark_url_complete(tbd_url)
-
-            # # Check for other possible urls in sitemaps
-            # sitemap_urls = self.check_and_process_sitemap(base_url)
-            # for sitemap_url in sitemap_urls:
-            #     self.frontier.add_url(sitemap_url, depth)
-
-            # Time delay for politeness
-            time.sleep(self.config.time_delay)
-        # Log info
-        self.logger.info(f"Number of Unique Pages: {self.unique.count}")
-        self.logger.info(f"Number of subdomains: {self.subdomains.count}")
-
-    def fetch_robots(self, url):
-        # Fetch robots.txt if one exists
-        parser = RobotFileParser()
-        robots_url = urljoin(url, '/robots.txt')
-        try:
-            socket.setdefaulttimeout(3)
-            parser.set_url(robots_url)
-            parser.read()
-            return parser
-        except socket.timeout:
-            self.logger.warning("Timeout occurred while fetching robots.txt")
-            return None
-        except Exception as e:
-            self.logger.warning(f"Failed to fetch or parse robots.txt for {url}: {e}")
-            return None
+                if self.traps.check(scraped_url, depth) is None and self.frontier.add_url(scraped_url, depth):
+                    self.traps.added(scraped_url)
+                    added += 1
+            metrics.incr("links_found", len(scraped_urls))
+            metrics.incr("links_added", added)
+        except Exception:
+            self.logger.exception(f"Failed to process {tbd_url}")
         finally:
-            socket.setdefaulttimeout(None)
+            self.frontier.mark_url_complete(tbd_url)
 
     def robot_allowed(self, url):
-        robot = self.fetch_robots(url)
-        if robot:
-            # If robots.txt found and parsed, check if crawling is allowed
-            return robot.can_fetch("*", url)
-        # If robots.txt not found, allow crawling
-        return True
+        # robots.txt of the url's host comes from the shared cache, missing or unreachable robots.txt allows crawling
+        return self.robots.allowed(url)
     
     def check_and_process_sitemap(self, url):
         robots_url = urljoin(url, '/robots.txt')
@@ -3,15 +3,28 @@ from argparse import ArgumentParser
 
 from utils.server_registration import get_cache_server
 from utils.config import Config
+from utils.download import require_aiohttp
 from crawler import Crawler
+from crawler.frontier import Frontier
+from crawler.sqlite_frontier import SQLiteFrontier
+from crawler.worker import Worker
+from crawler.async_worker import AsyncWorker
+
+FRONTIERS = {"shelve": Frontier, "sqlite": SQLiteFrontier}
+WORKERS = {"threads": Worker, "async": AsyncWorker}
 
 
 def main(config_file, restart):
     cparser = ConfigParser()
     cparser.read(config_file)
     config = Config(cparser)
+    if config.engine == "async":
+        # fail now, not once the frontier and save files are open and the workers started
+        require_aiohttp()
     config.cache_server = get_cache_server(config, restart)
-    crawler = Crawler(config, restart)
+    crawler = Crawler(
+        config, restart, frontier_factory=FRONTIERS[config.frontier_backend],
+        worker_factory=WORKERS[config.engine])
     crawler.start()
 
 
@@ -1,29 +1,53 @@
+import heapq
 import json
+import os
+
+from configparser import ConfigParser
+
+from utils.config import Config
+from utils.word_counts import merge_runs, list_runs
+
+# the report files the crawler wrote, as named in config.ini
+cparser = ConfigParser()
+cparser.read("config.ini")
+config = Config(cparser)
 
 # parse report2
 longest_page = ""
 longest_count = 0
 
-with open("report-2.txt") as file:
-    for line in file:
-        page, count = line.rsplit(' ', 1)
-        if int(count) > longest_count:
-            longest_page = page
-            longest_count = int(count)
+if os.path.exists(config.analytics_file):
+    with open(config.analytics_file) as file:
+        for line in file:
+            record = json.loads(line)
+            if record["words"] is not None and record["words"] > longest_count:
+                longest_page = record["url"]
+                longest_count = record["words"]
+else:
+    # report 2 output of older crawls
+    with open("report-2.txt") as file:
+        for line in file:
+            page, count = line.rsplit(' ', 1)
+            if int(count) > longest_count:
+                longest_page = page
+                longest_count = int(count)
 
 print(longest_page)
 print(longest_count)
 
 
 # parse report3
-with open("report-3.json", "r") as file:
-    data = json.load(file)
-
-# sort by descending
-sorted_items = sorted(data.items(), key=lambda x:x[1], reverse=True)
-
-top50 = sorted_items[:50]
+runs = list_runs(config.frequencies_dir)
+if runs:
+    # stream the merged runs, only the current top 50 is ever held in memory
+    top50 = heapq.nlargest(50, merge_runs(runs), key=lambda x:x[1])
+elif os.path.exists("report-3.json"):
+    # report 3 output of older crawls
+    with open("report-3.json", "r") as file:
+        data = json.load(file)
+    top50 = heapq.nlargest(50, data.items(), key=lambda x:x[1])
+else:
+    top50 = []
 
 for word, count in top50:
     print(word, count)
-        
\ No newline at end of file
@@ -1,37 +1,111 @@
-import re
 from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
-import hashlib
-import json
-import numpy as np
-from collections import defaultdict
-
-def scraper(url, resp, small_buffer):
-    links = extract_next_links(url, resp, small_buffer)
-    if(links != []):
-        decoded = resp.raw_response.content.decode("utf-8", errors="ignore")
-        soup = BeautifulSoup(decoded, 'html.parser')
-        text = soup.get_text()
-        weight = findWeights(text)
-        fingerprint = generate_fingerprint(weight)
-        small_buffer.append(fingerprint)  # small buffer that stores valid fingerprint of the URL to compare later
-    
-    # prep output for report 2
-    decoded = resp.raw_response.content.decode("utf-8", errors="ignore")
-    soup = BeautifulSoup(decoded, 'html.parser')
-    text = soup.get_text()  # use beautiful soup to get content from HTML tags
-    numWords = len(findWords(text))
-    with open("report-2.txt", "a") as file:
-        file.write(url + " " + str(numWords)+"\n")  # for report question number 2 longest page in terms of word
-    
-    # prep output for report 3
-    update_frequencies(text)
-    return [link for link in links if is_valid(link)], small_buffer
-    #return [link for link in links if is_valid(link)]
 
+from utils import get_logger, PER_URL
+
+from utils.tokenizer import tokenize, count_tokens, STOPWORDS
+from utils.simhash import generate_fingerprint
+from utils.url_filter import UrlFilter
+from utils.content_filter import ContentFilter
+from utils.html_parsers import get_parser
+from utils.metrics import metrics
+
+# compiled url rules, response size/type limits and html parser backend, configure() replaces them with the ones in config.ini
+url_filter = UrlFilter()
+content_filter = ContentFilter()
+html_parser = get_parser("stream")
+# one message per filtered url, sampled like the worker's (SAMPLE in config.ini)
+logger = get_logger("SCRAPER", "Worker")
+
+
+def configure(config):
+    ''' Loads the url rules, content limits and html parser from config.ini, the Crawler calls this before any url is filtered. '''
+    global url_filter, content_filter, html_parser
+    url_filter = UrlFilter.from_config(config)
+    content_filter = ContentFilter.from_config(config)
+    html_parser = get_parser(config.html_parser)
+
+# extract_next_links was not given the analysis of the page, as opposed to an analysis that is None
+NOT_ANALYZED = object()
+
+def scraper(url, resp, near_duplicates, page=None):
+    # page: analyze_page(resp) if the caller already has it (e.g. from crawler/parser_pool.py)
+    if page is None:
+        page = analyze_page(resp)   # decode + parse the response once, every consumer below reuses it
+    # passed on even if None, so a page that can't be parsed isn't parsed a second time
+    links = extract_next_links(url, resp, near_duplicates, page)
+    # the analysis goes back to the worker too, it records the report 2/3 output
+    return filter_urls(links), page
+
+
+def analyze_page(resp):
+    '''
+    Decodes and parses the response exactly once
+    Returns the outlinks, word count, word frequencies, text/HTML ratio and fingerprint of the page, or None if it can't be parsed
+    '''
+    if prefilter(resp) is not None:
+        return None
+    # resp.text is decoded once, with the encoding of the headers or <meta> tag (utils/response.py)
+    return analyze_text(resp.text, resp.url)
 
-def extract_next_links(url, resp, small_buffer):
-    #every time extract is called, a buffer for the current url, save the last five pages
+
+def prefilter(resp):
+    '''
+    Cheap checks of the raw response (Content-Type, Content-Length, byte size) before anything is decoded or parsed
+    Returns why the page is not worth parsing, or None
+    '''
+    return content_filter.check(resp)
+
+
+def analyze_content(content, base_url, encoding="utf-8"):
+    '''
+    analyze_page on the raw bytes of a page, so it can run in another process
+    Only the compact results are returned (no soup, text or token list), they are cheap to send back
+    '''
+    return analyze_text(content.decode(encoding, errors="ignore"), base_url)
+
+
+def analyze_text(decoded, base_url):
+    '''
+    analyze_page on the decoded html of a page
+    '''
+    try:
+        # content of HTML tags and the href of every link (utils/html_parsers.py, HTMLPARSER in config.ini)
+        text, hrefs = html_parser(decoded)
+    except:
+        return None
+
+    # base url (resp.url) in case of relative urls found
+    links = []
+    try:
+        for href in hrefs:
+            if href != "#" and href is not None:
+                absolute_link = href
+                # check if the link is already an absolute URL
+                if not urlparse(href).scheme:
+                    # convert relative link to absolute link
+                    absolute_link = urljoin(base_url, href)
+                links.append(absolute_link)
+    except:
+        links = []
+
+    # length of the raw markup instead of soup.prettify(), which re-serializes the whole tree
+    html_length = len(decoded)
+    words = findWords(text)
+    # (recorded in the process that parses, only the worker's total "parse" time is seen with PARSEPROCESSES)
+    with metrics.timer("fingerprint"):
+        fingerprint = generate_fingerprint(findWeights(text))
+    return {
+        "word_count": len(words),
+        "frequencies": wordFrequencies(text, words),
+        "links": links,
+        "text_length": len(text),
+        "ratio": len(text) / html_length if html_length else 0.0,
+        "fingerprint": fingerprint,
+    }
+
+
+def extract_next_links(url, resp, near_duplicates, page=NOT_ANALYZED):
+    # near_duplicates: index of the fingerprints of every page crawled so far (crawler/near_duplicates.py)
     # Implementation required.
     # url: the URL that was used to get the page
     # resp.url: the actual url of the page
@@ -40,264 +114,93 @@ def extract_next_links(url, resp, small_buffer):
     # resp.raw_response: this is where the page actually is. More specifically, the raw_response has two parts:
     #         resp.raw_response.url: the url, again
     #         resp.raw_response.content: the content of the page!
+    # page: the result of analyze_page(resp) (None if it can't be parsed), computed here only if it isn't given
     # Return a list with the hyperlinks (as strings) scrapped from resp.raw_response.content
 
     # error checking to make sure the crawler won't crash
     if resp.status != 200:
-        print(resp.error)
+        logger.info(f"Not scraping {url}: status <{resp.status}>, {resp.error}", extra=PER_URL)
         return list()
-    elif not resp.raw_response.content:
-        return list()
-    
-    try:
-        # decode bytes to html
-        decoded = resp.raw_response.content.decode("utf-8", errors="ignore")
-    except:
-        return list()
-    
-    try:
-        # parse for href
-        soup = BeautifulSoup(decoded, 'html.parser')
-    except:
+    elif not resp.content:
         return list()
 
-    # get base url in case of relative urls found
-    base_url = resp.url
+    if page is NOT_ANALYZED:
+        page = analyze_page(resp)
+    if page is None:
+        return list()
 
     try:
         # FILTER OUT: large & small files
-        text = soup.get_text()
-        text_length = len(text)
-        with open("length_threshold.txt", "a") as file:
-            file.write(str(text_length)+"\n")  # save the result into the file
+        # (lengths and ratios of every page are recorded by the worker, see crawler/analytics.py)
+        # (the reason goes back to the worker in page["filtered"], see crawler/traps.py)
+        text_length = page["text_length"]
         if text_length < 300 or text_length > 38000:  # either the page contains too little or too much words
-            print(f"Filtering out {url} bc file too large/small")
+            logger.info(f"Filtering out {url} bc file too large/small", extra=PER_URL)
+            page["filtered"] = "size"
             return list()
 
         # FILTER OUT: low information
-        html_length = len(soup.prettify())
-        ratio = text_length / html_length
-        with open("ratio_threshold.txt", "a") as file:
-            file.write(str(ratio)+"\n")
+        ratio = page["ratio"]
         if ratio <= 0.03:
-            print(f"Filtering out {url} bc low info")
+            logger.info(f"Filtering out {url} bc low info", extra=PER_URL)
+            page["filtered"] = "low info"
             return list()
 
         # FILTER OUT: similar pages w/ simhashing
-        currWeight = findWeights(text)
-        currFingerprint = generate_fingerprint(currWeight)
-        for prevFingerprint in small_buffer:
-            if similarity(currFingerprint, prevFingerprint) >= (60.8/64):   # 95% similarity
-                print(f"Filtering out {url} bc too similar")
-                return list()
+        # remembers this page's fingerprint if no crawled page is within the distance threshold (~95% similarity)
+        with metrics.timer("near_duplicates"):
+            duplicate = near_duplicates.find_or_add(page["fingerprint"], url)
+        if duplicate is not None:
+            logger.info(f"Filtering out {url} bc too similar to {duplicate}", extra=PER_URL)
+            page["filtered"] = "near duplicate"
+            return list()
     except:
         return list()
 
-
-    final_links = []  # links that will be returned to the frontier
-    try:
-        links = soup.find_all("a")
-        for link in links:
-            href = link.get("href")
-            if href != "#" and href is not None:
-                absolute_link = href
-                # check if the link is already an absolute URL
-                if not urlparse(href).scheme:
-                    # convert relative link to absolute link
-                    absolute_link = urljoin(base_url, href)
-                final_links.append(absolute_link)
-    except:
-        return list()
-    return final_links
+    # links that will be returned to the frontier
+    return list(page["links"])
 
 def is_valid(url):
     # Decide whether to crawl this url or not. 
     # If you decide to crawl it, return True; otherwise return False.
     # There are already some conditions that return False.
     
-    try:
-        url = url.replace('\u200E', '')  # handling U+200E Left-to-Right Mark (LRM) Unicode Character
-        parsed = urlparse(url)
-        if parsed.scheme not in set(["http", "https"]):
-            return False
-
-        events = r'/events/'
-        calendar = r'/calendar/'
-        if re.search(events, url) or re.search(calendar, url):
-            return False
-        banlist = ['gitlab.com']
-        if any(word in url for word in banlist):
-            return False
-        query_banlist = ['edit', 'download', 'login', 'backlink', 'share', 'ical', 'id=', 'version=', 'history']
-        if any(word in parsed.query for word in query_banlist):
-            return False
-        frag_banlist = ['menu', 'L']
-        if any(word in parsed.fragment for word in frag_banlist):
-            return False
-        # banlist for traps, don't crawl them
-
-        # FILTER OUT: non ics.uci.edu domains
-        domains = ["ics.uci.edu", "cs.uci.edu", "informatics.uci.edu", "stat.uci.edu"]
-        if not any(domain in parsed.netloc for domain in domains):
-            return False
-
-        return not re.match(
-            r".*\.(css|js|bmp|gif|jpe?g|ico"
-            + r"|png|tiff?|mid|mp2|mp3|mp4"
-            + r"|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf"
-            + r"|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names"
-            + r"|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso"
-            + r"|epub|dll|cnf|tgz|sha1"
-            + r"|thmx|mso|arff|rtf|jar|csv"
-            + r"|rm|smil|wmv|swf|wma|zip|rar|gz)$", parsed.path.lower())
-
-    except TypeError:
-        # print ("TypeError for ", parsed)
-        raise
+    # The rules (schemes, allowed domains, banned words, query/fragment ban lists and
+    # non-webpage extensions) are in utils/url_filter.py and the [FILTER] section of config.ini.
+    return url_filter.is_valid(url)
 
 
-def findWords(text):
+def filter_urls(urls):
     '''
-    Finds all the words on the page, accounts for ' and -
-    Used for report q2 output
+    is_valid over a whole list of urls
+    Returns the valid ones in order
     '''
-    all_tokens = []
-    token = ""
-    for c in text:
-        if (('A' <= c <= 'Z') or ('a' <= c <= 'z') or ('0' <= c <= '9') or (c == "'") or (c == "-")):
-            token += c
-        else:
-            if token:   # if token not empty, add token
-                all_tokens.append(token.lower())
-                token = ""
-    
-    if token:   # add last token
-        all_tokens.append(token.lower())
-    
-    return all_tokens
+    with metrics.timer("is_valid"):
+        valid = url_filter.filter_urls(urls)
+    metrics.incr("urls_checked", len(urls))
+    return valid
 
 
-def wordFrequencies(text):
+def findWords(text):
     '''
-    Finds all the frequencies of words, accounts for ' and -
-    Used for report q3 output
+    Finds all the words on the page, accounts for ' and -
+    Used for report q2 output
     '''
-    all_tokens = []
-    token = ""
-    for c in text:
-        if (('A' <= c <= 'Z') or ('a' <= c <= 'z') or ('0' <= c <= '9') or (c == "'") or (c == "-")):
-            token += c
-        else:
-            if token:   # if token not empty, add token
-                all_tokens.append(token.lower())
-                token = ""
-    
-    if token:   # add last token
-        all_tokens.append(token.lower())
-    
-    map = defaultdict(int)
-    # loop through each token and increment its counter in the map
-
-    # stop words
-    stopwords = [
-        "a", "about", "above", "after", "again", "against", "all", "am", "an", "and", "any", "are", "aren't", "as", "at",
-        "be", "because", "been", "before", "being", "below", "between", "both", "but", "by", "can't", "cannot", "could",
-        "couldn't", "did", "didn't", "do", "does", "doesn't", "doing", "don't", "down", "during", "each", "few", "for",
-        "from", "further", "had", "hadn't", "has", "hasn't", "have", "haven't", "having", "he", "he'd", "he'll", "he's",
-        "her", "here", "here's", "hers", "herself", "him", "himself", "his", "how", "how's", "i", "i'd", "i'll", "i'm",
-        "i've", "if", "in", "into", "is", "isn't", "it", "it's", "its", "itself", "let's", "me", "more", "most", "mustn't",
-        "my", "myself", "no", "nor", "not", "of", "off", "on", "once", "only", "or", "other", "ought", "our", "ours",
-        "ourselves", "out", "over", "own", "same", "shan't", "she", "she'd", "she'll", "she's", "should", "shouldn't", "so",
-        "some", "such", "than", "that", "that's", "the", "their", "theirs", "them", "themselves", "then", "there",
-        "there's", "these", "they", "they'd", "they'll", "they're", "they've", "this", "those", "through", "to", "too",
-        "under", "until", "up", "very", "was", "wasn't", "we", "we'd", "we'll", "we're", "we've", "were", "weren't", "what",
-        "what's", "when", "when's", "where", "where's", "which", "while", "who", "who's", "whom", "why", "why's", "with",
-        "won't", "would", "wouldn't", "you", "you'd", "you'll", "you're", "you've", "your", "yours", "yourself", "yourselves"
-    ]
-
-    for token in all_tokens:
-        if token not in stopwords and len(token) > 1:
-            map[token] += 1
-    
-    return dict(map)
+    return tokenize(text)
 
 
-def update_frequencies(text):
+def wordFrequencies(text, words=None):
     '''
-    Updates json file with new frequencies
+    Finds all the frequencies of words, accounts for ' and -
     Used for report q3 output
     '''
-    try:
-        with open("report-3.json", "r") as file:
-            old_data = json.load(file)
-    except:
-        old_data = {}
-    
-    frequencies = wordFrequencies(text)
-
-    for word, count in frequencies.items():
-        if word in old_data:
-            old_data[word] += count
-        else:
-            old_data[word] = count
-    
-    with open("report-3.json", "w") as file:  # write into files to answer question number 3, most common words under these domains
-        json.dump(old_data, file, indent=4)
+    if words is None:
+        words = tokenize(text)
+    return dict(count_tokens(words, stopwords=STOPWORDS, min_length=2))
 
 
 def findWeights(text):
     '''
     Finds the frequency of each token in a page
     '''
-    all_tokens = []
-    token = ""
-    for c in text:
-        if (('A' <= c <= 'Z') or ('a' <= c <= 'z') or ('0' <= c <= '9')):
-            token += c
-        else:
-            if token:   # if token not empty, add token
-                all_tokens.append(token.lower())
-                token = ""
-    
-    if token:   # add last token
-        all_tokens.append(token.lower())
-    
-    map = defaultdict(int)
-    # loop through each token and increment its counter in the map
-    for token in all_tokens:
-        map[token] += 1
-    
-    return dict(map)
-
-
-def generate_fingerprint(weights):
-    '''
-    Generates a fingerprint for simhashing purposes
-    '''
-    # initialize Vector V
-    V = np.zeros(64, dtype=int)
-
-    for word, weight in weights.items():
-        # generate hash value
-        hash_value = hashlib.sha256(word.encode()).digest()[:8]
-        hash = ''.join(f"{byte:08b}" for byte in hash_value)
-
-        # create vector V
-        for i, bit in enumerate(hash):
-            if bit == '1':
-                V[i] += weight
-            else:
-                V[i] -= weight
-
-    # generate fingerprint
-    fingerprint = np.where(V > 0, 1, 0)
-    return fingerprint
-
-
-def similarity(fingerprint1, fingerprint2):
-    '''
-    Compares 2 fingerprints and generate a similarity score
-    '''
-    same_bits = sum(b1 == b2 for b1, b2 in zip(fingerprint1, fingerprint2))
-
-    return same_bits / 64.0
\ No newline at end of file
+    return dict(count_tokens(tokenize(text, with_punctuation=False)))
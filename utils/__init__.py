@@ -1,27 +1,117 @@
 import os
+import atexit
+import itertools
 import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from threading import Lock
 from hashlib import sha256
 from urllib.parse import urlparse
 
+# pass as extra= on messages logged once per url, only 1 in [LOGGING] SAMPLE of them is kept
+PER_URL = {"per_url": True}
+
+# Loggers only put records on a queue, one listener thread formats them and writes the Logs/ files and the console
+_queue = SimpleQueue()
+_listener = None
+_setup_lock = Lock()
+_levels = {}            # lowercase logger or log file name -> level, "level" for every logger
+_sample = 1
+_per_url_count = itertools.count()
+
+
+class _LogFileRouter(logging.Handler):
+    ''' Runs in the listener thread: writes each record to the console and to Logs/<log file of its logger>.log. '''
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.formatter = logging.Formatter(
+           "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+        self.console = logging.StreamHandler()
+        self.console.setLevel(_levels.get("console", logging.INFO))
+        self.console.setFormatter(self.formatter)
+        self.files = {}
+
+    def emit(self, record):
+        fh = self.files.get(record.log_file)
+        if fh is None:
+            if not os.path.exists("Logs"):
+                os.makedirs("Logs")
+            fh = self.files[record.log_file] = logging.FileHandler(f"Logs/{record.log_file}.log")
+            fh.setFormatter(self.formatter)
+        fh.handle(record)
+        if record.levelno >= self.console.level:
+            self.console.handle(record)
+
+    def flush(self):
+        for fh in self.files.values():
+            fh.flush()
+        self.console.flush()
+
+
+class _LogFileQueueHandler(QueueHandler):
+    ''' Queues the records of one logger tagged with its log file, dropping the per-url messages that aren't sampled. '''
+    def __init__(self, log_file):
+        super().__init__(_queue)
+        self.log_file = log_file
+
+    def filter(self, record):
+        if getattr(record, "per_url", False) and _sample > 1 and next(_per_url_count) % _sample:
+            return False
+        return super().filter(record)
+
+    def prepare(self, record):
+        # the record goes to no other handler (the logger doesn't propagate), so it is merged in place, not copied
+        record.msg = self.format(record)
+        record.message = record.msg
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        record.log_file = self.log_file
+        return record
+
+
+def _level_of(name, filename):
+    for key in (name.lower(), filename.lower()):
+        if key in _levels:
+            return _levels[key]
+    return _levels.get("level", logging.INFO)
+
+
 def get_logger(name, filename=None):
+    ''' The logger called name, writing to Logs/<filename or name>.log and the console through the log listener.
+    Calling it again for the same name returns the same logger without adding handlers. '''
+    global _listener
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    if not os.path.exists("Logs"):
-        os.makedirs("Logs")
-    fh = logging.FileHandler(f"Logs/{filename if filename else name}.log")
-    fh.setLevel(logging.DEBUG)
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
-    formatter = logging.Formatter(
-       "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    fh.setFormatter(formatter)
-    ch.setFormatter(formatter)
-    # add the handlers to the logger
-    logger.addHandler(fh)
-    logger.addHandler(ch)
+    with _setup_lock:
+        if _listener is None:
+            _listener = QueueListener(_queue, _LogFileRouter())
+            _listener.start()
+            # write out what is still queued when the crawler exits
+            atexit.register(_listener.stop)
+        if not any(isinstance(handler, _LogFileQueueHandler) for handler in logger.handlers):
+            logger.addHandler(_LogFileQueueHandler(filename if filename else name))
+            logger.propagate = False
+        logger.setLevel(_level_of(name, filename or name))
     return logger
 
 
+def configure_logging(config):
+    ''' Applies the [LOGGING] levels and sampling of config.ini, to the loggers that already exist too. '''
+    global _sample
+    with _setup_lock:
+        _levels.clear()
+        _levels.update(config.log_levels)
+        _sample = max(config.log_sample, 1)
+        if _listener is not None:
+            _listener.handlers[0].console.setLevel(_levels.get("console", logging.INFO))
+        for logger in logging.Logger.manager.loggerDict.values():
+            if isinstance(logger, logging.Logger):
+                for handler in logger.handlers:
+                    if isinstance(handler, _LogFileQueueHandler):
+                        logger.setLevel(_level_of(logger.name, handler.log_file))
+
+
 def get_urlhash(url):
     parsed = urlparse(url)
     # everything other than scheme.
@@ -0,0 +1,43 @@
+import shelve
+
+from threading import Lock
+
+from utils import get_urlhash
+
+
+class ResponseArchive(object):
+    ''' Cache server answers as they came over the wire, so a crawl can be replayed offline
+    (benchmarks/stub_server.py serves them back). In shelve: stores url hashes as keys and
+    (url, http status, cbor answer) as values. '''
+    def __init__(self, path, flag="c", sync_every=100):
+        self.lock = Lock()
+        self.save = shelve.open(path, flag)
+        self.sync_every = sync_every
+        self.unsynced = 0
+
+    def __len__(self):
+        with self.lock:
+            return len(self.save)
+
+    def record(self, url, status_code, content):
+        ''' Keeps the answer of the cache server for url, replacing an earlier one. '''
+        with self.lock:
+            self.save[get_urlhash(url)] = (url, status_code, content)
+            self.unsynced += 1
+            if self.unsynced >= self.sync_every:
+                self.save.sync()
+                self.unsynced = 0
+
+    def get(self, url):
+        ''' (http status, cbor answer) recorded for url, or None. '''
+        with self.lock:
+            entry = self.save.get(get_urlhash(url))
+        return None if entry is None else entry[1:]
+
+    def urls(self):
+        with self.lock:
+            return [url for url, _, _ in self.save.values()]
+
+    def close(self):
+        with self.lock:
+            self.save.close()
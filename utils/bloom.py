@@ -0,0 +1,65 @@
+import math
+
+
+class BloomFilter(object):
+    ''' Fixed size Bloom filter over 64-bit integer hashes. The k bit positions come from the two 32-bit halves of
+    the hash (double hashing), so callers hash each key once. Never a false negative, false positives at about
+    error_rate once `capacity` keys are in. '''
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, key):
+        bits, size = self.bits, self.size
+        position, step = key & 0xFFFFFFFF, (key >> 32) | 1
+        for _ in range(self.hashes):
+            bit = position % size
+            bits[bit >> 3] |= 1 << (bit & 7)
+            position += step
+        self.count += 1
+
+    def __contains__(self, key):
+        bits, size = self.bits, self.size
+        position, step = key & 0xFFFFFFFF, (key >> 32) | 1
+        for _ in range(self.hashes):
+            bit = position % size
+            # most absent keys stop at the first or second unset bit
+            if not bits[bit >> 3] & (1 << (bit & 7)):
+                return False
+            position += step
+        return True
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter(object):
+    ''' A Bloom filter that grows: once the newest filter is full a filter twice its capacity is added, with half
+    its error rate, so the overall false positive rate stays under 2 * error_rate however many keys go in. '''
+    def __init__(self, capacity=1000000, error_rate=0.001):
+        self.error_rate = error_rate
+        self.filters = [BloomFilter(capacity, error_rate / 2)]
+
+    def add(self, key):
+        ''' Adds a key that is not in the filter yet (check first, keys added twice are counted twice). '''
+        if self.filters[-1].full:
+            last = self.filters[-1]
+            self.filters.append(BloomFilter(last.capacity * 2, self.error_rate / 2 ** (len(self.filters) + 1)))
+        self.filters[-1].add(key)
+
+    def __contains__(self, key):
+        for bloom in self.filters:
+            if key in bloom:
+                return True
+        return False
+
+    def __len__(self):
+        return sum(bloom.count for bloom in self.filters)
+
+    @property
+    def nbytes(self):
+        return sum(len(bloom.bits) for bloom in self.filters)
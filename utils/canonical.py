@@ -0,0 +1,56 @@
+from urllib.parse import urlsplit, urlunsplit
+
+from utils import normalize
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# query parameters that only track where a visitor came from, they never change the page
+TRACKING_PARAMS = frozenset([
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "utm_id",
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "_ga", "_gl", "yclid", "igshid"])
+
+
+def remove_dot_segments(path):
+    ''' Resolves . and .. segments of a path (RFC 3986, section 5.2.4). '''
+    if "." not in path:
+        return path
+    segments = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(segments) > 1:
+                segments.pop()
+        elif segment != ".":
+            segments.append(segment)
+    # a trailing . or .. still names a directory
+    if path.endswith(("/.", "/..")):
+        segments.append("")
+    return "/".join(segments)
+
+
+def canonical_query(query):
+    ''' The query with tracking parameters and empty pairs dropped and the rest sorted, each pair kept as encoded. '''
+    pairs = [pair for pair in query.split("&") if pair and pair.split("=", 1)[0].lower() not in TRACKING_PARAMS]
+    return "&".join(sorted(pairs))
+
+
+def canonicalize(url):
+    ''' One spelling per page: no fragment, lowercase scheme and host, no default port, dot segments resolved,
+    query parameters sorted without tracking parameters, and no trailing slash (utils.normalize).
+    get_urlhash leaves out the scheme, so http and https spellings of a url share a frontier entry too. '''
+    try:
+        parsed = urlsplit(url.strip())
+        port = parsed.port
+    except ValueError:
+        # malformed netloc or port, keep it as it was
+        return normalize(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").rstrip(".")
+    if ":" in host:
+        # IPv6 address
+        host = f"[{host}]"
+    netloc = host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+    if "@" in parsed.netloc:
+        netloc = parsed.netloc.rsplit("@", 1)[0] + "@" + netloc
+    return normalize(urlunsplit(
+        (scheme, netloc, remove_dot_segments(parsed.path), canonical_query(parsed.query), "")))
@@ -1,3 +1,4 @@
+import os
 import re
 
 
@@ -8,14 +9,109 @@ class Config(object):
         assert self.user_agent != "DEFAULT AGENT", "Set useragent in config.ini"
         assert re.match(r"^[a-zA-Z0-9_ ,]+$", self.user_agent), "User agent should not have any special characters outside '_', ',' and 'space'"
         self.threads_count = int(config["LOCAL PROPERTIES"]["THREADCOUNT"])
+        # "threads": one blocking download per worker thread, "async": each worker thread runs an event loop
+        # with CONCURRENCY downloads in flight, scrapes pages on EXECUTORTHREADS threads and fetches robots.txt on
+        # ROBOTSTHREADS others
+        self.engine = config["LOCAL PROPERTIES"].get("ENGINE", "threads").strip().lower()
+        self.concurrency = int(config["LOCAL PROPERTIES"].get("CONCURRENCY", "100"))
+        self.executor_threads = int(config["LOCAL PROPERTIES"].get("EXECUTORTHREADS", "4"))
+        self.robots_threads = int(config["LOCAL PROPERTIES"].get("ROBOTSTHREADS", "4"))
+        # html parser backend (utils/html_parsers.py): stream, bs4, lxml or selectolax
+        self.html_parser = config["LOCAL PROPERTIES"].get("HTMLPARSER", "stream").strip().lower()
+        # pages are parsed in PARSEPROCESSES worker processes (0: in the worker threads), at most PARSEBACKLOG at a time
+        self.parse_processes = int(config["LOCAL PROPERTIES"].get("PARSEPROCESSES", "0"))
+        self.parse_backlog = int(config["LOCAL PROPERTIES"].get("PARSEBACKLOG", str(2 * max(self.parse_processes, 1))))
+        # crawl metrics are logged every METRICSINTERVAL seconds (0: only at the end) and served on METRICSPORT (0: not served)
+        self.metrics_interval = float(config["LOCAL PROPERTIES"].get("METRICSINTERVAL", "60"))
+        self.metrics_port = int(config["LOCAL PROPERTIES"].get("METRICSPORT", "0"))
+        # every cache server answer is also saved to this archive for offline replay (empty: not recorded)
+        self.record_archive = config["LOCAL PROPERTIES"].get("RECORD", "").strip()
+        # compressed segments of every parsed page (empty: pages are not kept), written by a background thread
+        self.pages_dir = config["LOCAL PROPERTIES"].get("PAGES", "pages").strip()
+        self.pages_compression = config["LOCAL PROPERTIES"].get("PAGESCOMPRESSION", "zlib").strip().lower()
+        self.pages_segment_bytes = int(config["LOCAL PROPERTIES"].get("PAGESEGMENTBYTES", str(256 * 2 ** 20)))
+        self.pages_queue_size = int(config["LOCAL PROPERTIES"].get("PAGESQUEUE", "1000"))
+        # [LOGGING]: level by logger or log file name (lowercase), LEVEL for the rest, CONSOLE for what is printed,
+        # and 1 in SAMPLE per-url messages kept
+        logging_section = config["LOGGING"] if config.has_section("LOGGING") else {}
+        self.log_levels = {key.lower(): value.strip().upper() for key, value in logging_section.items() if key.lower() != "sample"}
+        self.log_sample = int(logging_section.get("SAMPLE", "1"))
+        # never fewer pooled connections than workers, or workers would queue for a connection
+        self.pool_size = max(int(config["CONNECTION"].get("POOLSIZE", "1")), self.threads_count)
         self.save_file = config["LOCAL PROPERTIES"]["SAVE"].split(',')[0]
         self.unique_file = config["LOCAL PROPERTIES"]["SAVE"].split(',')[1]
         self.subdomain_file = config["LOCAL PROPERTIES"]["SAVE"].split(',')[2]
+        # frontier storage backend, "shelve" or "sqlite" (batched commits, see crawler/sqlite_frontier.py)
+        self.frontier_backend = config["LOCAL PROPERTIES"].get("FRONTIER", "shelve").strip().lower()
+        self.commit_every = int(config["LOCAL PROPERTIES"].get("COMMITEVERY", "500"))
+        self.commit_interval = float(config["LOCAL PROPERTIES"].get("COMMITINTERVAL", "5"))
+        # Bloom filter of the urls in the shelve frontier, sized for BLOOMCAPACITY urls before it grows
+        self.bloom_capacity = int(config["LOCAL PROPERTIES"].get("BLOOMCAPACITY", "1000000"))
+        self.bloom_error_rate = float(config["LOCAL PROPERTIES"].get("BLOOMERRORRATE", "0.001"))
+        # fingerprints of crawled pages and robots.txt files, kept next to the frontier save file unless given explicitly
+        saves = config["LOCAL PROPERTIES"]["SAVE"].split(',')
+        self.near_duplicate_file = saves[3] if len(saves) > 3 else os.path.join(
+            os.path.dirname(self.save_file), "near_duplicates.shelve")
+        self.robots_file = saves[4] if len(saves) > 4 else os.path.join(
+            os.path.dirname(self.save_file), "robots.shelve")
+        # url templates blocked as crawler traps
+        self.traps_file = saves[6] if len(saves) > 6 else os.path.join(
+            os.path.dirname(self.save_file), "traps.shelve")
+        # urls that failed for good (status, error, attempts)
+        self.failures_file = saves[5] if len(saves) > 5 else os.path.join(
+            os.path.dirname(self.save_file), "failures.shelve")
+
+        # report 3 word frequencies are flushed as sorted runs into this directory
+        self.frequencies_dir = config["LOCAL PROPERTIES"].get("FREQUENCIES", "report-3")
+        # in-memory report data is flushed after this many pages or seconds, whichever comes first
+        self.flush_pages = int(config["LOCAL PROPERTIES"].get("FLUSHPAGES", "200"))
+        self.flush_interval = float(config["LOCAL PROPERTIES"].get("FLUSHINTERVAL", "30"))
+        self.max_runs = int(config["LOCAL PROPERTIES"].get("MAXRUNS", "32"))
+        # per page records for report 2 and the length/ratio thresholds
+        self.analytics_file = config["LOCAL PROPERTIES"].get("ANALYTICS", "analytics.jsonl")
+        self.analytics_queue_size = int(config["LOCAL PROPERTIES"].get("ANALYTICSQUEUE", "10000"))
+        self.analytics_batch = int(config["LOCAL PROPERTIES"].get("ANALYTICSBATCH", "200"))
 
         self.host = config["CONNECTION"]["HOST"]
         self.port = int(config["CONNECTION"]["PORT"])
+        # downloads from the cache server share one keep-alive connection pool
+        self.connect_timeout = float(config["CONNECTION"].get("CONNECTTIMEOUT", "5"))
+        self.read_timeout = float(config["CONNECTION"].get("READTIMEOUT", "30"))
 
         self.seed_urls = config["CRAWLER"]["SEEDURL"].split(",")
         self.time_delay = float(config["CRAWLER"]["POLITENESS"])
+        self.duplicate_distance = int(config["CRAWLER"].get("DUPLICATEDISTANCE", "3"))
+        self.duplicate_blocks = int(config["CRAWLER"].get("DUPLICATEBLOCKS", str(self.duplicate_distance + 2)))
+        # robots.txt files are cached this many seconds, failed fetches for ROBOTSERRORTTL seconds
+        self.robots_ttl = float(config["CRAWLER"].get("ROBOTSTTL", "86400"))
+        self.robots_error_ttl = float(config["CRAWLER"].get("ROBOTSERRORTTL", "3600"))
+        self.robots_timeout = float(config["CRAWLER"].get("ROBOTSTIMEOUT", "3"))
+        # failed downloads are retried up to RETRYLIMIT times, after RETRYBACKOFF * 2^(attempt - 1) seconds (at most RETRYMAXDELAY)
+        self.retry_limit = int(config["CRAWLER"].get("RETRYLIMIT", "5"))
+        self.retry_backoff = float(config["CRAWLER"].get("RETRYBACKOFF", "2"))
+        self.retry_max_delay = float(config["CRAWLER"].get("RETRYMAXDELAY", "300"))
+        # responses are rejected before parsing outside these sizes (bytes) and content types
+        self.min_page_bytes = int(config["CRAWLER"].get("MINPAGEBYTES", "300"))
+        self.max_page_bytes = int(config["CRAWLER"].get("MAXPAGEBYTES", "2000000"))
+        self.content_types = [
+            value.strip().lower()
+            for value in config["CRAWLER"].get("CONTENTTYPES", "text/html,application/xhtml+xml").split(",")
+            if value.strip()]
+        # crawler trap detection (crawler/traps.py)
+        self.trap_max_depth = int(config["CRAWLER"].get("TRAPMAXDEPTH", "120"))
+        self.trap_repeats = int(config["CRAWLER"].get("TRAPREPEATS", "3"))
+        self.trap_query_values = int(config["CRAWLER"].get("TRAPQUERYVALUES", "100"))
+        self.trap_template_backlog = int(config["CRAWLER"].get("TRAPTEMPLATEBACKLOG", "500"))
+        self.trap_min_pages = int(config["CRAWLER"].get("TRAPMINPAGES", "20"))
+        self.trap_bad_ratio = float(config["CRAWLER"].get("TRAPBADRATIO", "0.8"))
+
+        # url filter rules (utils/url_filter.py), every option in [FILTER] replaces one built-in list
+        rules = config["FILTER"] if config.has_section("FILTER") else {}
+        self.url_rules = {
+            name: [value.strip() for value in rules[key].split(",") if value.strip()]
+            for key, name in (("SCHEMES", "schemes"), ("DOMAINS", "domains"), ("BANNED", "banned"),
+                              ("BANNEDQUERY", "banned_query"), ("BANNEDFRAGMENT", "banned_fragment"),
+                              ("EXTENSIONS", "extensions"))
+            if key in rules}
 
         self.cache_server = None
\ No newline at end of file
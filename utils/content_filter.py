@@ -0,0 +1,58 @@
+from collections import Counter
+from threading import Lock
+
+# content types worth parsing for links and words, a response without a Content-Type header is parsed too
+DEFAULT_CONTENT_TYPES = ["text/html", "application/xhtml+xml"]
+
+
+class ContentFilter(object):
+    ''' Rejects responses that can't pass the scraper's filters before anything is decoded or parsed: no content,
+    a non-html Content-Type, a Content-Length or body over max_bytes, a body under min_bytes (its text can't reach
+    the 300 character minimum either), or NUL bytes near the start (binary data served as html).
+    The rejections are counted by reason. '''
+    def __init__(self, min_bytes=300, max_bytes=2000000, content_types=None, sniff_bytes=512):
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.content_types = frozenset(content_types or DEFAULT_CONTENT_TYPES)
+        self.sniff_bytes = sniff_bytes
+        self.lock = Lock()
+        self.rejected = Counter()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.min_page_bytes, config.max_page_bytes, config.content_types)
+
+    def check(self, resp):
+        ''' Why the response is not worth parsing, or None if it is. '''
+        reason = self._reason(resp)
+        if reason is not None:
+            with self.lock:
+                self.rejected[reason] += 1
+        return reason
+
+    def summary(self):
+        with self.lock:
+            return dict(self.rejected)
+
+    def _reason(self, resp):
+        # resp.body is a view of the page bytes, nothing below copies more than sniff_bytes of them
+        body = resp.body
+        if not body:
+            return "empty"
+        headers = resp.headers
+        content_type = headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+        if content_type and content_type not in self.content_types:
+            return "content type"
+        try:
+            if int(headers.get("Content-Length", 0)) > self.max_bytes:
+                return "too large"
+        except ValueError:
+            pass
+        size = len(body)
+        if size > self.max_bytes:
+            return "too large"
+        if size < self.min_bytes:
+            return "too small"
+        if b"\x00" in body[:self.sniff_bytes].tobytes():
+            return "binary"
+        return None
@@ -1,21 +1,163 @@
+import asyncio
 import requests
 import cbor
 import time
 
+from threading import Lock
+from requests.adapters import HTTPAdapter
+
 from utils.response import Response
+from utils.archive import ResponseArchive
+
+try:
+    import aiohttp
+except ImportError:
+    # only needed by the asyncio engine (crawler/async_worker.py)
+    aiohttp = None
+
+# One pooled, keep-alive session shared by every worker. Nearly all requests go to the
+# single cache server, so reusing its connections saves a TCP handshake per download.
+_session = None
+_session_lock = Lock()
+
+
+class DownloadStats(object):
+    ''' Latency, error and connection reuse counters of the shared session. '''
+    def __init__(self):
+        self.lock = Lock()
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency, error=False):
+        with self.lock:
+            self.requests += 1
+            self.errors += error
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def summary(self):
+        with self.lock:
+            summary = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "mean_latency": self.total_latency / self.requests if self.requests else 0.0,
+                "max_latency": self.max_latency,
+            }
+        # every pool counts the connections it opened and the requests it sent over them
+        connections = sent = 0
+        if _session is not None:
+            pools = _session.get_adapter("http://").poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                connections += pool.num_connections
+                sent += pool.num_requests
+        summary["connections"] = connections
+        summary["connection_reuse"] = 1 - connections / sent if sent else 0.0
+        return summary
+
+
+stats = DownloadStats()
+# with RECORD set, every answer of the cache server is also saved here (see record_to)
+archive = None
+
+
+def record_to(path):
+    ''' Starts saving every cache server answer to the archive at path, for offline replay. '''
+    global archive
+    archive = ResponseArchive(path)
+    return archive
+
+
+def stop_recording():
+    global archive
+    if archive is not None:
+        archive.close()
+        archive = None
+
+
+def get_session(config):
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # pool_block makes extra threads wait for a free connection instead of opening throwaway ones
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.pool_size, pool_block=True)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
 
 def download(url, config, logger=None):
     host, port = config.cache_server
-    resp = requests.get(
-        f"http://{host}:{port}/",
-        params=[("q", f"{url}"), ("u", f"{config.user_agent}")])
+    start = time.time()
+    try:
+        resp = get_session(config).get(
+            f"http://{host}:{port}/",
+            params=[("q", f"{url}"), ("u", f"{config.user_agent}")],
+            timeout=(config.connect_timeout, config.read_timeout))
+    except requests.exceptions.RequestException as e:
+        stats.record(time.time() - start, error=True)
+        if logger:
+            logger.error(f"Spacetime request error {e} with url {url}.")
+        # no status, the request never got an answer from the cache server
+        return Response({
+            "error": f"Spacetime request error {e} with url {url}.",
+            "status": None,
+            "url": url})
+    return _to_response(url, resp.status_code, resp.content, start, logger)
+
+
+def require_aiohttp():
+    ''' Raises RuntimeError if aiohttp is not installed, launch.py calls it before anything is set up for ENGINE = async. '''
+    if aiohttp is None:
+        raise RuntimeError("The asyncio engine needs aiohttp: python -m pip install aiohttp")
+
+
+def get_async_session(config):
+    ''' A keep-alive aiohttp session for one event loop, with up to config.concurrency connections. '''
+    require_aiohttp()
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=config.concurrency),
+        timeout=aiohttp.ClientTimeout(sock_connect=config.connect_timeout, sock_read=config.read_timeout))
+
+
+async def async_download(session, url, config, logger=None):
+    ''' Same as download, through an aiohttp session from get_async_session. '''
+    host, port = config.cache_server
+    start = time.time()
+    try:
+        async with session.get(
+                f"http://{host}:{port}/",
+                params=[("q", f"{url}"), ("u", f"{config.user_agent}")]) as resp:
+            content = await resp.read()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        stats.record(time.time() - start, error=True)
+        if logger:
+            logger.error(f"Spacetime request error {e!r} with url {url}.")
+        return Response({
+            "error": f"Spacetime request error {e!r} with url {url}.",
+            "status": None,
+            "url": url})
+    return _to_response(url, resp.status, content, start, logger)
+
+
+def _to_response(url, status_code, content, start, logger):
+    ''' Unpacks the cache server's cbor answer, or describes why there is none. '''
+    if archive is not None and content:
+        archive.record(url, status_code, content)
     try:
-        if resp and resp.content:
-            return Response(cbor.loads(resp.content))
+        if status_code < 400 and content:
+            stats.record(time.time() - start)
+            return Response(cbor.loads(content))
     except (EOFError, ValueError) as e:
         pass
-    logger.error(f"Spacetime Response error {resp} with url {url}.")
+    stats.record(time.time() - start, error=True)
+    if logger:
+        logger.error(f"Spacetime Response error <Response [{status_code}]> with url {url}.")
     return Response({
-        "error": f"Spacetime Response error {resp} with url {url}.",
-        "status": resp.status_code,
+        "error": f"Spacetime Response error <Response [{status_code}]> with url {url}.",
+        "status": status_code,
         "url": url})
@@ -0,0 +1,188 @@
+''' Backends that turn decoded html into (text, hrefs): the visible text the way BeautifulSoup's get_text() returns it,
+and the href of every <a> tag in document order (None for an <a> without one).
+
+bs4        BeautifulSoup with html.parser, builds the whole tree. Always available, the fallback.
+stream     html.parser.HTMLParser subclass that keeps only text nodes and hrefs, no tree. Same output as bs4.
+lxml       lxml.html (C parser), if installed. Its html parser fixes broken markup differently, so text may differ.
+selectolax selectolax (C parser), if installed. Same caveat as lxml.
+'''
+import re
+
+from html.entities import html5
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+from utils import get_logger
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+# bs4 leaves the strings inside these tags out of get_text()
+HIDDEN_TAGS = frozenset(["script", "style", "template", "rt", "rp"])
+# inside these, whitespace-only strings are kept as they are instead of collapsing to one space or newline
+PRESERVE_WHITESPACE_TAGS = frozenset(["pre", "textarea"])
+VOID_TAGS = frozenset([
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta", "param",
+    "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid", "spacer"])
+ASCII_SPACES = str.maketrans("", "", "\x20\x0a\x09\x0c\x0d")
+# a numeric character reference not terminated by ;, followed by text
+DECIMAL_REFERENCE = re.compile("^([0-9]+)(.*)")
+HEX_REFERENCE = re.compile("^([0-9a-f]+)(.*)")
+
+
+def parse_bs4(html):
+    soup = BeautifulSoup(html, "html.parser")
+    return soup.get_text(), [link.get("href") for link in soup.find_all("a")]
+
+
+class _TextAndLinks(HTMLParser):
+    ''' Collects what bs4 would put in get_text() and find_all("a"), following the same html.parser events
+    (BeautifulSoupHTMLParser), but without building the tree. '''
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.text = []
+        self.hrefs = []
+        self.data = []
+        self.open_tags = []
+        self.hidden = 0
+        self.preserve = 0
+
+    def handle_starttag(self, tag, attrs):
+        self._end_data()
+        if tag == "a":
+            href = None
+            for key, value in attrs:
+                if key == "href":
+                    # like bs4: an attribute without a value is "", the last of duplicates wins
+                    href = "" if value is None else value
+            self.hrefs.append(href)
+        if tag in VOID_TAGS:
+            return
+        self.open_tags.append(tag)
+        self.hidden += tag in HIDDEN_TAGS
+        self.preserve += tag in PRESERVE_WHITESPACE_TAGS
+
+    def handle_startendtag(self, tag, attrs):
+        # <tag/> opens and closes at once, no text inside
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._end_data()
+        if tag not in self.open_tags:
+            return
+        # like bs4, closes every tag opened after the most recent one of this name
+        while True:
+            name = self.open_tags.pop()
+            self.hidden -= name in HIDDEN_TAGS
+            self.preserve -= name in PRESERVE_WHITESPACE_TAGS
+            if name == tag:
+                return
+
+    def handle_data(self, data):
+        self.data.append(data)
+
+    def handle_entityref(self, name):
+        character = html5.get(name + ";")
+        self.data.append(character if character is not None else "&" + name)
+
+    def handle_charref(self, name):
+        base, pattern = 10, DECIMAL_REFERENCE
+        if name[:1] in "xX":
+            name, base, pattern = name[1:], 16, HEX_REFERENCE
+        try:
+            self.data.append(_numeric_character(int(name, base)))
+        except ValueError:
+            match = pattern.search(name)
+            if match is None:
+                self.data.append(name)
+            else:
+                self.data.append(_numeric_character(int(match.group(1), base)) + match.group(2))
+
+    def unknown_decl(self, data):
+        self._end_data()
+        if data.upper().startswith("CDATA["):
+            # CDATA sections are text, even inside hidden tags
+            self.text.append(data[len("CDATA["):])
+
+    def handle_comment(self, data):
+        self._end_data()
+
+    def handle_decl(self, decl):
+        self._end_data()
+
+    def handle_pi(self, data):
+        self._end_data()
+
+    def _end_data(self):
+        if not self.data:
+            return
+        data = "".join(self.data)
+        self.data = []
+        if not self.preserve and not data.translate(ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+        if not self.hidden:
+            self.text.append(data)
+
+
+def _numeric_character(number):
+    ''' A numeric character reference the way bs4 reads it, numbers below 256 as windows-1252. As in HTML5, 0,
+    surrogates (0xD800-0xDFFF) and numbers past 0x10FFFF are the replacement character. '''
+    if number == 0 or 0xD800 <= number <= 0xDFFF or number > 0x10FFFF:
+        return "\N{REPLACEMENT CHARACTER}"
+    if number < 256:
+        try:
+            return bytes([number]).decode("windows-1252")
+        except UnicodeDecodeError:
+            pass
+    return chr(number)
+
+
+def parse_stream(html):
+    parser = _TextAndLinks()
+    parser.feed(html)
+    parser.close()
+    parser._end_data()
+    return "".join(parser.text), parser.hrefs
+
+
+def parse_lxml(html):
+    if not html.strip():
+        return "", []
+    root = lxml.html.document_fromstring(html)
+    hrefs = [link.get("href") for link in root.iter("a")]
+    # strip the hidden tags but keep their tails, which are text of the parent
+    etree.strip_elements(root, *HIDDEN_TAGS, etree.Comment, etree.ProcessingInstruction, with_tail=False)
+    return root.text_content(), hrefs
+
+
+def parse_selectolax(html):
+    tree = SelectolaxParser(html)
+    hrefs = [link.attributes["href"] or "" if "href" in link.attributes else None for link in tree.css("a")]
+    tree.strip_tags(list(HIDDEN_TAGS))
+    return (tree.root.text(deep=True) if tree.root else ""), hrefs
+
+
+PARSERS = {"bs4": parse_bs4, "stream": parse_stream}
+if lxml is not None:
+    PARSERS["lxml"] = parse_lxml
+if SelectolaxParser is not None:
+    PARSERS["selectolax"] = parse_selectolax
+
+
+def get_parser(name):
+    ''' The backend called name, bs4 if it is not installed. '''
+    if name not in PARSERS:
+        get_logger("PARSER").warning(f"HTML parser {name} is not available, using bs4")
+        return parse_bs4
+    return PARSERS[name]
@@ -0,0 +1,180 @@
+import time
+
+from bisect import bisect_left
+from collections import Counter
+from threading import Lock, local
+
+# upper bounds (seconds) of the latency buckets, roughly 3 per decade from 10 us to 60 s
+BUCKETS = tuple(scale * 10 ** exponent for exponent in range(-5, 2) for scale in (1, 2.5, 5)) + (60.0,)
+
+
+class Histogram(object):
+    ''' Latencies of one stage: count, sum, max and counts per bucket of BUCKETS (the last one open ended). '''
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def quantile(self, q):
+        ''' Upper bound of the bucket holding the q-th latency, max for the open ended one. '''
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class _Timer(object):
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _Collector(object):
+    __slots__ = ("metrics", "recorded")
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __enter__(self):
+        self.recorded = self.metrics.local.recorded = []
+        return self.recorded
+
+    def __exit__(self, *exc_info):
+        self.metrics.local.recorded = None
+        return False
+
+
+class Metrics(object):
+    ''' Counters, latency histograms and gauges of the crawl, shared by all threads of the process (see the `metrics`
+    instance below). Recording is a dict update under one lock, everything else happens in snapshot(), which the
+    reporter (crawler/metrics.py) calls every few seconds. '''
+    def __init__(self):
+        self.lock = Lock()
+        self.started = time.time()
+        self.counters = Counter()
+        self.histograms = dict()
+        self.gauges = dict()
+        self.local = local()
+
+    def incr(self, name, amount=1):
+        recorded = getattr(self.local, "recorded", None)
+        if recorded is not None:
+            recorded.append(("incr", name, amount))
+        with self.lock:
+            self.counters[name] += amount
+
+    def observe(self, name, seconds):
+        recorded = getattr(self.local, "recorded", None)
+        if recorded is not None:
+            recorded.append(("observe", name, seconds))
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def timer(self, name):
+        ''' with metrics.timer("download"): ... records how long the block took. '''
+        return _Timer(self, name)
+
+    def timed(self, name):
+        ''' Decorator version of timer. '''
+        def decorator(function):
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            wrapper.__name__ = function.__name__
+            wrapper.__doc__ = function.__doc__
+            return wrapper
+        return decorator
+
+    def collect(self):
+        ''' with metrics.collect() as recorded: ... also lists what this thread records in the block, as
+        ("incr" or "observe", name, value), so a parser process can send it back to the crawler's process. '''
+        return _Collector(self)
+
+    def replay(self, recorded):
+        ''' Records, in this process, what collect() listed in another one. '''
+        for kind, name, value in recorded:
+            getattr(self, kind)(name, value)
+
+    def gauge(self, name, read):
+        ''' Registers a function whose value is read at every snapshot, e.g. the frontier's queue length. '''
+        with self.lock:
+            self.gauges[name] = read
+
+    def snapshot(self):
+        ''' {"uptime", "counters", "gauges", "latency": {stage: Histogram.summary()}} '''
+        with self.lock:
+            counters = dict(self.counters)
+            latency = {name: histogram.summary() for name, histogram in self.histograms.items()}
+            gauges = list(self.gauges.items())
+        values = {}
+        for name, read in gauges:
+            try:
+                values[name] = read()
+            except Exception:
+                values[name] = None
+        return {"uptime": time.time() - self.started, "counters": counters, "gauges": values, "latency": latency}
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters = Counter()
+            self.histograms = dict()
+
+
+def render(snapshot):
+    ''' A snapshot as text, one "name value" line per number (Prometheus text format, without type comments). '''
+    lines = [f"crawler_uptime_seconds {snapshot['uptime']:.3f}"]
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f"crawler_{name}_total {value}")
+    for name, value in sorted(snapshot["gauges"].items()):
+        if value is not None:
+            lines.append(f"crawler_{name} {value}")
+    for name, summary in sorted(snapshot["latency"].items()):
+        for q in ("p50", "p95", "p99"):
+            lines.append(f'crawler_{name}_seconds{{quantile="0.{q[1:]}"}} {summary[q]:.6f}')
+        lines.append(f"crawler_{name}_seconds_sum {summary['total']:.6f}")
+        lines.append(f"crawler_{name}_seconds_count {summary['count']}")
+    return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,149 @@
+import mmap
+import os
+import shelve
+import struct
+import zlib
+
+from collections import namedtuple
+from threading import Lock
+
+from utils import get_urlhash
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Crawled pages are appended to segment files, <dir>/<number>.seg, WARC-like: a segment header naming the
+# compression, then one record per page, a header, the url and content type, and the compressed body.
+# Segments are only ever appended to, a new one is started once one reaches the size limit.
+# <dir>/index.shelve maps get_urlhash(url) to (segment number, offset, record size) for random reads.
+SEGMENT_MAGIC = b"PAGESEG1"
+SEGMENT_HEADER = struct.Struct("<8s8s")              # magic, codec name padded with NULs
+RECORD_MAGIC = b"PAGE"
+RECORD_HEADER = struct.Struct("<4shdHHII")           # magic, status, fetch time, url length, content type length,
+                                                     # body length, compressed body length
+CODECS = ("zlib", "zstd") if zstandard is not None else ("zlib",)
+
+StoredPage = namedtuple("StoredPage", "url status fetched content_type content")
+
+
+def segment_path(directory, number):
+    return os.path.join(directory, f"{number:08d}.seg")
+
+
+def list_segments(directory):
+    ''' Segment numbers in directory, in order. '''
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(name.split(".")[0]) for name in os.listdir(directory) if name.endswith(".seg"))
+
+
+def compressor(codec):
+    ''' bytes -> compressed bytes, for a codec in CODECS. zlib and zstd release the GIL while they compress. '''
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress
+    return lambda data: zlib.compress(data, 6)
+
+
+def decompressor(codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This page store segment is zstd compressed: python -m pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress
+    return zlib.decompress
+
+
+def encode_segment_header(codec):
+    return SEGMENT_HEADER.pack(SEGMENT_MAGIC, codec.encode("ascii"))
+
+
+def encode_record(compress, url, status, fetched, content_type, content):
+    ''' One page as a record, its body compressed with compress. '''
+    url = url.encode("utf-8")
+    content_type = (content_type or "").encode("utf-8")
+    body = compress(content)
+    header = RECORD_HEADER.pack(
+        RECORD_MAGIC, status, fetched, len(url), len(content_type), len(content), len(body))
+    return b"".join((header, url, content_type, body))
+
+
+def decode_record(buffer, offset, decompress):
+    ''' (StoredPage, offset after it) of the record at offset of a bytes-like buffer. '''
+    magic, status, fetched, url_length, type_length, _, body_length = RECORD_HEADER.unpack_from(buffer, offset)
+    if magic != RECORD_MAGIC:
+        raise ValueError(f"No page record at offset {offset}")
+    start = offset + RECORD_HEADER.size
+    url = bytes(buffer[start:start + url_length]).decode("utf-8")
+    start += url_length
+    content_type = bytes(buffer[start:start + type_length]).decode("utf-8")
+    start += type_length
+    content = decompress(buffer[start:start + body_length])
+    return StoredPage(url, status, fetched, content_type, content), start + body_length
+
+
+def read_segment_codec(file):
+    magic, codec = SEGMENT_HEADER.unpack(file.read(SEGMENT_HEADER.size))
+    if magic != SEGMENT_MAGIC:
+        raise ValueError(f"{file.name} is not a page store segment")
+    return codec.rstrip(b"\0").decode("ascii")
+
+
+def iter_pages(directory):
+    ''' Streams every stored page (StoredPage) in the order it was written, one segment at a time, without the index.
+    A record cut short by a crash at the end of the last segment ends the stream. '''
+    for number in list_segments(directory):
+        with open(segment_path(directory, number), "rb") as file:
+            decompress = decompressor(read_segment_codec(file))
+            while True:
+                header = file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                _, _, _, url_length, type_length, _, body_length = RECORD_HEADER.unpack(header)
+                rest = file.read(url_length + type_length + body_length)
+                if len(rest) < url_length + type_length + body_length:
+                    break
+                yield decode_record(header + rest, 0, decompress)[0]
+
+
+class PageReader(object):
+    ''' Random reads of a page store by url, through the index and memory maps of the segments.
+    Maps are opened on first use and reopened when a segment has grown past them. A writer sharing the index
+    updates it under self.lock. '''
+    def __init__(self, directory, index=None):
+        self.directory = directory
+        self.index = index if index is not None else shelve.open(os.path.join(directory, "index.shelve"), "r")
+        self.lock = Lock()
+        self.maps = {}      # segment number -> (file, mmap, decompress)
+
+    def __contains__(self, url):
+        with self.lock:
+            return get_urlhash(url) in self.index
+
+    def get(self, url):
+        ''' The stored page of url (StoredPage), or None. '''
+        with self.lock:
+            entry = self.index.get(get_urlhash(url))
+            if entry is None:
+                return None
+            number, offset, size = entry
+            file, buffer, decompress = self._map(number, offset + size)
+            return decode_record(buffer, offset, decompress)[0]
+
+    def close(self):
+        with self.lock:
+            for file, buffer, _ in self.maps.values():
+                buffer.close()
+                file.close()
+            self.maps = {}
+
+    def _map(self, number, end):
+        mapped = self.maps.get(number)
+        if mapped is None or len(mapped[1]) < end:
+            if mapped is not None:
+                mapped[1].close()
+                mapped[0].close()
+            file = open(segment_path(self.directory, number), "rb")
+            decompress = decompressor(read_segment_codec(file))
+            mapped = self.maps[number] = (file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), decompress)
+        return mapped
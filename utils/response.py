@@ -1,14 +1,84 @@
+import codecs
 import pickle
+import re
+
+# where an html document may declare its encoding: in a <meta> within its first 1024 bytes (html prescan)
+META_CHARSET = re.compile(rb"""<meta[^>]*?charset\s*=\s*["']?\s*([-\w.:]+)""", re.IGNORECASE)
+HEADER_CHARSET = re.compile(r"""charset\s*=\s*["']?\s*([-\w.:]+)""", re.IGNORECASE)
+PRESCAN_BYTES = 1024
+BOMS = ((codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+def detect_encoding(content_type, content):
+    ''' The encoding of a page: its byte order mark, the charset of its Content-Type header, or of a <meta> tag,
+    utf-8 if none of them names a known text codec. '''
+    for bom, encoding in BOMS:
+        if content.startswith(bom):
+            return encoding
+    for declared in (HEADER_CHARSET.search(content_type or ""), META_CHARSET.search(content[:PRESCAN_BYTES])):
+        encoding = _text_encoding(declared)
+        if encoding is not None:
+            # a page read as bytes can't really be utf-16/32 without a BOM, html says to use utf-8 then
+            return "utf-8" if encoding.startswith(("utf-16", "utf-32")) else encoding
+    return "utf-8"
+
+
+def _text_encoding(declared):
+    ''' The codec name of a charset match, None if there is no match or it names no text encoding. Codecs like
+    rot13, hex, base64 or zip are looked up fine but can't decode bytes to str. '''
+    if declared is None:
+        return None
+    name = declared.group(1)
+    try:
+        info = codecs.lookup(name.decode("ascii") if isinstance(name, bytes) else name)
+    except (LookupError, UnicodeDecodeError):
+        return None
+    return info.name if info._is_text_encoding else None
+
 
 class Response(object):
+    ''' A cache server answer. The pickled requests.Response is only unpickled when raw_response is first read,
+    so error answers that are never looked at cost nothing, and the page is decoded once, on first use of text. '''
     def __init__(self, resp_dict):
         self.url = resp_dict["url"]
         self.status = resp_dict["status"]
         self.error = resp_dict["error"] if "error" in resp_dict else None
-        try:
-            self.raw_response = (
-                pickle.loads(resp_dict["response"])
-                if "response" in resp_dict else
-                None)
-        except TypeError:
-            self.raw_response = None
+        self._pickled = resp_dict.get("response")
+        self._raw_response = None
+        self._text = None
+
+    @property
+    def raw_response(self):
+        if self._pickled is not None:
+            try:
+                self._raw_response = pickle.loads(self._pickled)
+            except TypeError:
+                self._raw_response = None
+            self._pickled = None
+        return self._raw_response
+
+    @property
+    def content(self):
+        ''' The page bytes, b"" if there are none. '''
+        raw = self.raw_response
+        return (raw.content if raw is not None else None) or b""
+
+    @property
+    def body(self):
+        ''' A memoryview of the page bytes, for byte level checks that shouldn't copy them. '''
+        return memoryview(self.content)
+
+    @property
+    def headers(self):
+        return getattr(self.raw_response, "headers", None) or {}
+
+    @property
+    def encoding(self):
+        return detect_encoding(self.headers.get("Content-Type"), self.content)
+
+    @property
+    def text(self):
+        ''' The page decoded with its detected encoding, cached. '''
+        if self._text is None:
+            self._text = self.content.decode(self.encoding, errors="ignore")
+        return self._text
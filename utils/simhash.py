@@ -0,0 +1,93 @@
+import hashlib
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+FINGERPRINT_BITS = 64
+
+# int.bit_count() only exists on Python 3.10+
+_popcount = getattr(int, "bit_count", None) or (lambda value: bin(value).count("1"))
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_hash(token):
+    ''' First 8 bytes of the token's SHA-256, cached since most tokens repeat across pages. '''
+    return hashlib.sha256(token.encode()).digest()[:8]
+
+
+def generate_fingerprint(weights):
+    '''
+    Generates a 64-bit simhash fingerprint (as an int) from a token -> weight mapping
+    '''
+    if not weights:
+        return 0
+    # hash every token in one batch and unpack to an (n_tokens, 64) bit matrix, MSB first
+    digests = b"".join(_token_hash(token) for token in weights)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1)
+    counts = np.fromiter(weights.values(), dtype=np.int64, count=len(weights))
+    # each token votes +weight for its 1 bits and -weight for its 0 bits
+    V = 2 * (counts @ bits) - counts.sum()
+    return int.from_bytes(np.packbits(V > 0).tobytes(), "big")
+
+
+def hamming_distance(fingerprint1, fingerprint2):
+    ''' Number of differing bits between two fingerprints. '''
+    return _popcount(fingerprint1 ^ fingerprint2)
+
+
+def similarity(fingerprint1, fingerprint2):
+    '''
+    Compares 2 fingerprints and generate a similarity score
+    '''
+    return (FINGERPRINT_BITS - hamming_distance(fingerprint1, fingerprint2)) / float(FINGERPRINT_BITS)
+
+
+class SimhashIndex(object):
+    '''
+    In-memory index answering "is there a fingerprint within max_distance bits of this one?"
+    The 64 bits are cut into `blocks` blocks. Two fingerprints within max_distance bits differ in
+    at most max_distance blocks, so they agree exactly on at least blocks - max_distance of them.
+    There is one hash table per such combination of blocks, keyed on those bits, so a lookup only
+    compares against the few fingerprints that share a key instead of against every fingerprint.
+    '''
+    def __init__(self, max_distance=3, blocks=None):
+        self.max_distance = max_distance
+        blocks = blocks or max_distance + 2
+        assert max_distance < blocks <= FINGERPRINT_BITS, "need more blocks than max_distance"
+        # bit masks of each block, as even as possible
+        widths = [FINGERPRINT_BITS // blocks + (1 if i < FINGERPRINT_BITS % blocks else 0) for i in range(blocks)]
+        block_masks, shift = [], FINGERPRINT_BITS
+        for width in widths:
+            shift -= width
+            block_masks.append(((1 << width) - 1) << shift)
+        self.masks = [sum(combo) for combo in combinations(block_masks, blocks - max_distance)]
+        self.tables = [dict() for _ in self.masks]
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def find(self, fingerprint):
+        ''' Returns a stored fingerprint within max_distance bits of fingerprint, or None. '''
+        for mask, table in zip(self.masks, self.tables):
+            bucket = table.get(fingerprint & mask)
+            if bucket is None:
+                continue
+            # buckets hold a bare int until a second fingerprint shares the key, most never do
+            for candidate in (bucket if type(bucket) is list else (bucket,)):
+                if _popcount(fingerprint ^ candidate) <= self.max_distance:
+                    return candidate
+        return None
+
+    def add(self, fingerprint):
+        for mask, table in zip(self.masks, self.tables):
+            key = fingerprint & mask
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = fingerprint
+            elif type(bucket) is list:
+                bucket.append(fingerprint)
+            else:
+                table[key] = [bucket, fingerprint]
+        self.count += 1
@@ -0,0 +1,44 @@
+import re
+from collections import Counter
+
+# A token is a maximal run of ASCII letters and digits. For the report word
+# counts ' and - are word characters too, so "don't" and "e-mail" stay whole.
+WORD_PATTERN = re.compile(r"[A-Za-z0-9'\-]+")
+PLAIN_WORD_PATTERN = re.compile(r"[A-Za-z0-9]+")
+
+STOPWORDS = frozenset([
+    "a", "about", "above", "after", "again", "against", "all", "am", "an", "and", "any", "are", "aren't", "as", "at",
+    "be", "because", "been", "before", "being", "below", "between", "both", "but", "by", "can't", "cannot", "could",
+    "couldn't", "did", "didn't", "do", "does", "doesn't", "doing", "don't", "down", "during", "each", "few", "for",
+    "from", "further", "had", "hadn't", "has", "hasn't", "have", "haven't", "having", "he", "he'd", "he'll", "he's",
+    "her", "here", "here's", "hers", "herself", "him", "himself", "his", "how", "how's", "i", "i'd", "i'll", "i'm",
+    "i've", "if", "in", "into", "is", "isn't", "it", "it's", "its", "itself", "let's", "me", "more", "most", "mustn't",
+    "my", "myself", "no", "nor", "not", "of", "off", "on", "once", "only", "or", "other", "ought", "our", "ours",
+    "ourselves", "out", "over", "own", "same", "shan't", "she", "she'd", "she'll", "she's", "should", "shouldn't", "so",
+    "some", "such", "than", "that", "that's", "the", "their", "theirs", "them", "themselves", "then", "there",
+    "there's", "these", "they", "they'd", "they'll", "they're", "they've", "this", "those", "through", "to", "too",
+    "under", "until", "up", "very", "was", "wasn't", "we", "we'd", "we'll", "we're", "we've", "were", "weren't", "what",
+    "what's", "when", "when's", "where", "where's", "which", "while", "who", "who's", "whom", "why", "why's", "with",
+    "won't", "would", "wouldn't", "you", "you'd", "you'll", "you're", "you've", "your", "yours", "yourself", "yourselves"
+])
+
+
+def tokenize(text, with_punctuation=True):
+    '''
+    Splits text into lowercase tokens in a single regex pass
+    with_punctuation: whether ' and - count as part of a word
+    '''
+    pattern = WORD_PATTERN if with_punctuation else PLAIN_WORD_PATTERN
+    # lowercase each ASCII token rather than the whole text, str.lower() can turn
+    # some non-ASCII characters (e.g. the Kelvin sign) into ASCII letters
+    return [token.lower() for token in pattern.findall(text)]
+
+
+def count_tokens(tokens, stopwords=None, min_length=1):
+    '''
+    Counts tokens, skipping stopwords and tokens shorter than min_length
+    '''
+    if stopwords is None and min_length <= 1:
+        return Counter(tokens)
+    stopwords = stopwords or ()
+    return Counter(token for token in tokens if len(token) >= min_length and token not in stopwords)
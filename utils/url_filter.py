@@ -0,0 +1,85 @@
+import re
+
+# The built-in crawl rules, each can be replaced by a comma separated list in the [FILTER] section of config.ini
+DEFAULT_RULES = {
+    "schemes": ["http", "https"],
+    # a url is allowed if its host is one of these domains or a subdomain of one
+    "domains": ["ics.uci.edu", "cs.uci.edu", "informatics.uci.edu", "stat.uci.edu"],
+    # banned anywhere in the url (traps and sites not to crawl)
+    "banned": ["/events/", "/calendar/", "gitlab.com"],
+    "banned_query": ["edit", "download", "login", "backlink", "share", "ical", "id=", "version=", "history"],
+    "banned_fragment": ["menu", "L"],
+    # paths ending in .<extension> are not webpages
+    "extensions": [
+        "css", "js", "bmp", "gif", "jpeg", "jpg", "ico",
+        "png", "tif", "tiff", "mid", "mp2", "mp3", "mp4",
+        "wav", "avi", "mov", "mpeg", "ram", "m4v", "mkv", "ogg", "ogv", "pdf",
+        "ps", "eps", "tex", "ppt", "pptx", "doc", "docx", "xls", "xlsx", "names",
+        "data", "dat", "exe", "bz2", "tar", "msi", "bin", "7z", "psd", "dmg", "iso",
+        "epub", "dll", "cnf", "tgz", "sha1",
+        "thmx", "mso", "arff", "rtf", "jar", "csv",
+        "rm", "smil", "wmv", "swf", "wma", "zip", "rar", "gz"],
+}
+
+
+# scheme, netloc, path, query and fragment in one match (RFC 3986, appendix B), much cheaper than urlparse
+URL_PATTERN = re.compile(r"^\s*(?:([^:/?#]+):)?(?://([^/?#]*))?([^?#]*)(?:\?([^#]*))?(?:#(.*))?", re.DOTALL)
+# user info before the host, port or closing bracket of an IPv6 address after it
+HOST_PATTERN = re.compile(r"^(?:.*@)?(\[[^\]]*\]|[^:]*)")
+
+
+def _substring_pattern(words):
+    ''' One compiled regex matching any of the words anywhere, or None for no words. '''
+    if not words:
+        return None
+    return re.compile("|".join(re.escape(word) for word in sorted(words, key=len, reverse=True)))
+
+
+class UrlFilter(object):
+    ''' The is_valid rules compiled once: a frozenset of schemes and extensions, a set of allowed domains matched
+    against every suffix of the host, and one compiled regex per ban list instead of a substring scan per word. '''
+    def __init__(self, rules=None):
+        rules = dict(DEFAULT_RULES, **(rules or {}))
+        self.schemes = frozenset(scheme.lower() for scheme in rules["schemes"])
+        self.domains = frozenset(domain.lower().strip(".") for domain in rules["domains"])
+        self.extensions = frozenset(extension.lower().lstrip(".") for extension in rules["extensions"])
+        self.banned = _substring_pattern(rules["banned"])
+        self.banned_query = _substring_pattern(rules["banned_query"])
+        self.banned_fragment = _substring_pattern(rules["banned_fragment"])
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.url_rules)
+
+    def is_valid(self, url):
+        url = url.replace('\u200E', '')  # handling U+200E Left-to-Right Mark (LRM) Unicode Character
+        scheme, netloc, path, query, fragment = URL_PATTERN.match(url).groups()
+        if not scheme or scheme.lower() not in self.schemes or not netloc:
+            return False
+        if self.banned and self.banned.search(url):
+            return False
+        if self.banned_query and query and self.banned_query.search(query):
+            return False
+        if self.banned_fragment and fragment and self.banned_fragment.search(fragment):
+            return False
+        if not self._allowed_host(HOST_PATTERN.match(netloc).group(1).strip("[]").lower()):
+            return False
+        # extension of the last path segment, without its ;params, "" if it has none
+        segment = path[path.rfind("/") + 1:].split(";", 1)[0]
+        _, dot, extension = segment.rpartition(".")
+        return not (dot and extension.lower() in self.extensions)
+
+    def filter_urls(self, urls):
+        ''' The valid urls of a list, in order. '''
+        is_valid = self.is_valid
+        return [url for url in urls if is_valid(url)]
+
+    def _allowed_host(self, host):
+        # www.ics.uci.edu -> www.ics.uci.edu, ics.uci.edu, uci.edu, edu
+        domains = self.domains
+        while True:
+            if host in domains:
+                return True
+            _, dot, host = host.partition(".")
+            if not dot:
+                return False
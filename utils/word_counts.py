@@ -0,0 +1,40 @@
+import heapq
+import os
+from itertools import groupby
+from operator import itemgetter
+
+# Word counts are written as sorted runs: one "word count" line per word, sorted by word.
+# Runs never need to be loaded whole, any number of them merge in one streaming pass.
+
+
+def write_run(path, pairs):
+    ''' Writes (word, count) pairs, already sorted by word, as a run file. '''
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as file:
+        for word, count in pairs:
+            file.write(f"{word} {count}\n")
+    # only complete runs ever appear under their final name
+    os.replace(tmp_path, path)
+
+
+def read_run(path):
+    ''' Streams (word, count) pairs of a run file in word order. '''
+    with open(path) as file:
+        for line in file:
+            word, count = line.rsplit(" ", 1)
+            yield word, int(count)
+
+
+def merge_runs(paths):
+    ''' Streams (word, total count) pairs over all runs in word order. '''
+    merged = heapq.merge(*(read_run(path) for path in paths), key=itemgetter(0))
+    for word, pairs in groupby(merged, key=itemgetter(0)):
+        yield word, sum(count for _, count in pairs)
+
+
+def list_runs(directory):
+    ''' Run files in a directory, oldest first. '''
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".run"))